@@ -1,8 +1,18 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db.models import Q
 from django.utils.safestring import mark_safe
 
-from .models import Category, Comment, Location, Post
+from .models import Category, Comment, Location, Post, PostSearch
+from .pagination import AdminCountPaginator
+from .search import match_expression
+
+# Символ больше любого другого: строки с префиксом term —
+# это ровно term <= x < term + MAX_CHAR.
+MAX_CHAR = '\U0010ffff'
 
 # Удалила дефолтную модель *Group* из админки.
 admin.site.unregister(Group)
@@ -13,8 +23,65 @@ admin.site.site_title = "Панель администрирования"
 admin.site.index_title = "Добро пожаловать в админку, друг!"
 
 
+class CachedCountAdminMixin:
+    """Список считается один раз за ADMIN_COUNT_CACHE_TIMEOUT.
+
+    Второй COUNT(*) по всей таблице («всего N») тоже отключён.
+    """
+
+    paginator = AdminCountPaginator
+    show_full_result_count = False
+
+
+class IndexedSearchMixin(CachedCountAdminMixin):
+    """Поиск в админке по индексам, а не LIKE '%...%' по всей таблице.
+
+    Поля из search_fields ищутся по префиксу диапазоном
+    term <= поле < term + MAX_CHAR, который SQLite выполняет по индексу
+    (регистр учитывается). Поле связанной модели ('author__username')
+    превращается в author_id IN (...) — подзапрос по индексу связанной
+    таблицы. get_text_search добавляет поиск по индексу FTS5.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        conditions = [
+            self.prefix_condition(queryset.model, field, term)
+            for field in self.search_fields
+        ]
+        text_search = self.get_text_search(term)
+        if text_search is not None:
+            conditions.append(text_search)
+        return queryset.filter(reduce(or_, conditions)), False
+
+    def prefix_condition(self, model, field, term):
+        if '__' in field:
+            relation, field = field.split('__', 1)
+            related_model = model._meta.get_field(relation).related_model
+            return Q(**{
+                f'{relation}__in': related_model.objects.filter(
+                    self.prefix_condition(related_model, field, term)
+                ).values('pk')
+            })
+        return Q(**{f'{field}__gte': term, f'{field}__lt': term + MAX_CHAR})
+
+    def get_text_search(self, term):
+        return None
+
+    def matching_posts(self, term):
+        """Подзапрос id публикаций, найденных по индексу FTS5."""
+        expression = match_expression(term)
+        if expression is None:
+            return None
+        return PostSearch.objects.filter(
+            document__match=expression
+        ).values('post')
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     # Группировка полей при добавлении новой публикации через админ-панель
     fieldsets = (
         ('Инфо', {
@@ -41,13 +108,19 @@ class PostAdmin(admin.ModelAdmin):
     # Поля, которые можно только читать(не редактировать)
     readonly_fields = ('get_image_tag',)
 
+    # Заголовок и текст ищутся по индексу FTS5 (get_text_search).
     search_fields = (
-        'title',
-        'author',
-        'category',
+        'author__username',
+        'category__slug',
     )
     list_filter = ('is_published',
                    'category')
+    list_select_related = ('author', 'category')
+
+    def get_text_search(self, term):
+        posts = self.matching_posts(term)
+        if posts is not None:
+            return Q(pk__in=posts)
 
     @admin.display(
         description='Иллюстрация к посту',
@@ -56,12 +129,15 @@ class PostAdmin(admin.ModelAdmin):
         """Метод выводит миниатюру иллюстрации к посту в
         админ-панель(без него будет только ссылка на иллюстрацию).
         """
-        if obj.image:
-            return mark_safe(f'<img src="{obj.image.url}" width=50>')
+        # Заранее уменьшенная копия вместо полноразмерной картинки;
+        # у постов, чья миниатюра ещё не готова, — сама иллюстрация.
+        url = obj.thumbnail_url or (obj.image and obj.image.url)
+        if url:
+            return mark_safe(f'<img src="{url}" width=50>')
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(CachedCountAdminMixin, admin.ModelAdmin):
     fieldsets = (
         ('Информация', {
             'fields': ('title', 'description',),
@@ -80,7 +156,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Location)
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(CachedCountAdminMixin, admin.ModelAdmin):
     filelds = ['name',
                'is_published', ]
     list_display = (
@@ -95,19 +171,24 @@ class LocationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'post',
         'text',
         'author',
         'created_at',
     )
+    # Комментарии к публикациям ищутся и по индексу FTS5 публикаций.
     search_fields = (
-        'author',
-        'post',
-        'created_at',
+        'author__username',
     )
     list_display_links = ('text',)
+    list_select_related = ('post', 'author')
+
+    def get_text_search(self, term):
+        posts = self.matching_posts(term)
+        if posts is not None:
+            return Q(post__in=posts)
 
 
 admin.site.empty_value_display = 'Не задано'
@@ -5,3 +5,10 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from core.jobs import register
+
+        from . import signals  # noqa: F401
+
+        register('blog.post_image', 'blog.tasks.process_post_image')
@@ -0,0 +1,210 @@
+import math
+import random
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from blogicum.const import (CACHE_EARLY_RECOMPUTE_BETA, CACHE_LOCK_WAIT,
+                            CACHE_STALE_TIMEOUT, LOOKUP_CACHE_TIMEOUT,
+                            POST_CARD_CACHE_TIMEOUT)
+from core.locks import FileLock
+from core.routers import primary_reads
+
+GENERATION_KEY = 'blog:generation:{scope}:{pk}'
+POST_CARD_KEY = (
+    'blog:post_card:{pk}:{comment_count}:{images}:{generations}'
+)
+LOOKUP_KEY = 'blog:lookup:{name}:{value}'
+PAGE_KEY = 'blog:page:{digest}'
+PAGE_LEASE_KEY = 'blog:page_lease:{digest}'
+
+# Области видимости, у каждой из которых свой счётчик поколений.
+# Объектные — меняются при записи самого объекта:
+POST = 'post'
+CATEGORY = 'category'
+LOCATION = 'location'
+AUTHOR = 'author'
+# Списочные — меняются, когда может измениться состав ленты:
+FEED = 'feed'
+CATEGORY_FEED = 'category_feed'
+AUTHOR_FEED = 'author_feed'
+
+
+def generation_key(scope, pk):
+    return GENERATION_KEY.format(scope=scope, pk=pk)
+
+
+def get_generations(*scopes):
+    """Возвращает поколения для пар (scope, pk) одним обращением к кэшу.
+
+    Отсутствующее поколение заводится заново значением от текущего
+    времени, а не нулём: иначе после вытеснения счётчика из кэша снова
+    стали бы актуальными ключи, посчитанные при старом поколении.
+    """
+    keys = [generation_key(scope, pk) for scope, pk in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(*scopes):
+    """Делает устаревшими все ключи, собранные с этими поколениями.
+
+    Старые записи не удаляются — они просто больше не запрашиваются
+    и вытесняются из кэша по таймауту. Не cache.incr: FileBasedCache
+    пересохраняет ключ с таймаутом по умолчанию, и поколение истекало бы.
+    """
+    keys = {generation_key(scope, pk) for scope, pk in scopes}
+    if not keys:
+        return
+    if transaction.get_connection().in_atomic_block:
+        # Пока транзакция не закрыта, другие запросы читают старые
+        # данные и могут закэшировать их под новым поколением —
+        # после коммита поколение сдвигается ещё раз.
+        transaction.on_commit(lambda: set_next_generations(keys))
+    set_next_generations(keys)
+
+
+def set_next_generations(keys):
+    generations = cache.get_many(keys)
+    cache.set_many(
+        {
+            key: generations[key] + 1 if key in generations
+            else time.time_ns()
+            for key in keys
+        },
+        None,
+    )
+
+
+def scoped_key(name, scopes, *parts):
+    """Ключ кэша, в который вшиты текущие поколения областей."""
+    generations = get_generations(*scopes)
+    stamp = ','.join(
+        f'{scope}={pk}@{generation}'
+        for (scope, pk), generation in zip(scopes, generations)
+    )
+    return ':'.join(map(str, ('blog', name, stamp, *parts)))
+
+
+def is_due(expires, delta):
+    """Пора ли пересчитывать значение, которое истекает в expires.
+
+    Вероятностное раннее истечение (XFetch): чем ближе срок и чем дольше
+    считается значение (delta), тем вероятнее пересчёт заранее, так что
+    горячий ключ обновляет один запрос, а не все разом в момент срока.
+    """
+    if expires is None:
+        return False
+    jitter = -math.log(1.0 - random.random())
+    return time.time() + delta * CACHE_EARLY_RECOMPUTE_BETA * jitter >= expires
+
+
+def recompute(key, compute, timeout):
+    started = time.monotonic()
+    with primary_reads():
+        value = compute()
+    delta = time.monotonic() - started
+    if timeout is None:
+        cache.set(key, (value, None, delta), None)
+    else:
+        cache.set(
+            key,
+            (value, time.time() + timeout, delta),
+            timeout + CACHE_STALE_TIMEOUT,
+        )
+    return value
+
+
+def get_or_set(key, compute, timeout):
+    """Значение из кэша или compute(), посчитанное одним запросом
+    по основной базе (core.routers.primary_reads).
+
+    Запись хранится как (значение, срок, время пересчёта) и лежит
+    в кэше ещё CACHE_STALE_TIMEOUT после срока. Пересчитывает только
+    тот, кто взял межпроцессную блокировку ключа (core.locks.FileLock);
+    остальные тем временем получают прежнее значение, а если его нет —
+    ждут пересчёта до CACHE_LOCK_WAIT секунд.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if not is_due(expires, delta):
+            return value
+    lock = FileLock(key)
+    if lock.acquire(blocking=entry is None, timeout=CACHE_LOCK_WAIT):
+        try:
+            if entry is None:
+                # Пока ждали блокировку, значение мог посчитать другой.
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+            return recompute(key, compute, timeout)
+        finally:
+            lock.release()
+    if entry is not None:
+        return entry[0]
+    # Пересчёт затянулся дольше CACHE_LOCK_WAIT: не ждём его дальше.
+    return recompute(key, compute, timeout)
+
+
+def get_or_set_with_deps(key, compute, get_deps, timeout):
+    """get_or_set для значений, зависящих от заранее неизвестных областей.
+
+    get_deps(value) возвращает пары (scope, pk), от которых зависит
+    посчитанное значение; их поколения сохраняются рядом с ним и
+    сверяются при чтении.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        deps, value = entry
+        if get_generations(*deps) == list(deps.values()):
+            return value
+    with primary_reads():
+        value = compute()
+    deps = tuple(get_deps(value))
+    cache.set(key, (dict(zip(deps, get_generations(*deps))), value), timeout)
+    return value
+
+
+def lookup_key(name, value):
+    return LOOKUP_KEY.format(name=name, value=value)
+
+
+def cached_lookup(name, value, load):
+    """Недолгий кэш поиска объекта по slug/username между запросами."""
+    return get_or_set(lookup_key(name, value), load, LOOKUP_CACHE_TIMEOUT)
+
+
+def forget_lookups(name, *values):
+    cache.delete_many([lookup_key(name, value) for value in set(values)])
+
+
+def post_card_key(post):
+    """Ключ фрагмента карточки: меняется вместе с самим постом,
+    его категорией, местоположением, автором и числом комментариев.
+
+    Готовность копий иллюстрации тоже входит в ключ: их записывает
+    фоновый воркер, поколения которого при локальном кэше не видны
+    веб-процессам.
+    """
+    generations = get_generations(
+        (POST, post.pk),
+        (CATEGORY, post.category_id),
+        (LOCATION, post.location_id),
+        (AUTHOR, post.author_id),
+    )
+    return POST_CARD_KEY.format(
+        pk=post.pk,
+        comment_count=post.comment_count,
+        images=int(bool(post.image_variants)),
+        generations='.'.join(map(str, generations)),
+    )
+
+
+def get_or_render_post_card(post, render):
+    return get_or_set(post_card_key(post), render, POST_CARD_CACHE_TIMEOUT)
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import UploadImageField
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +9,7 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         exclude = ('author',)
+        field_classes = {'image': UploadImageField}
         widgets = {
             'pub_date': forms.DateTimeInput(
                 attrs={'type': 'datetime-local'},
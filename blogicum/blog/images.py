@@ -0,0 +1,122 @@
+import hashlib
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from blogicum.const import ADMIN_THUMBNAIL_SIZE, IMAGE_WIDTHS
+
+# Производные копии лежат по хешу содержимого оригинала: одинаковые
+# картинки не пересчитываются, а смена картинки даёт новые адреса,
+# которые можно отдавать с долгим кэшированием.
+DERIVED_DIR = 'posts_images/derived'
+
+# Форматы производных копий: (ключ в Post.image_variants, формат PIL,
+# расширение, параметры сохранения).
+FORMATS = (
+    ('webp', 'WEBP', 'webp', {'quality': 75, 'method': 6}),
+    ('jpeg', 'JPEG', 'jpg', {'quality': 80, 'optimize': True,
+                             'progressive': True}),
+)
+
+
+def strip_metadata(image_file):
+    """Убирает из оригинала EXIF (координаты съёмки, модель камеры).
+
+    Ориентация из EXIF переносится в сами пиксели. Очищенная картинка
+    сохраняется рядом, под новым именем, а оригинал не трогается:
+    удалить его можно только после того, как пост перейдёт на новый
+    файл. Возвращает имя нового файла или None, если EXIF не было.
+    """
+    storage = image_file.storage
+    image_file.open('rb')
+    try:
+        with Image.open(image_file) as original:
+            if not original.getexif():
+                return None
+            pil_format = original.format
+            image = ImageOps.exif_transpose(original)
+            options = {'quality': 95} if pil_format == 'JPEG' else {}
+            content = encode(image, pil_format, **options)
+    finally:
+        image_file.close()
+    return storage.save(image_file.name, content)
+
+
+def content_hash(image_file):
+    digest = hashlib.sha256()
+    image_file.open('rb')
+    try:
+        for chunk in image_file.chunks():
+            digest.update(chunk)
+    finally:
+        image_file.close()
+    return digest.hexdigest()[:32]
+
+
+def encode(image, pil_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def resized(image, width):
+    height = round(image.height * width / image.width)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def variant_widths(original_width):
+    """Ширины из IMAGE_WIDTHS, не превышающие ширину оригинала.
+
+    Картинки уже самой узкой ширины получают одну копию своей ширины.
+    """
+    widths = [width for width in IMAGE_WIDTHS if width <= original_width]
+    return widths or [original_width]
+
+
+def save_derived(storage, name, render):
+    """Сохраняет копию, если её ещё нет, и возвращает её имя."""
+    if not storage.exists(name):
+        name = storage.save(name, render())
+    return name
+
+
+def build_derivatives(image_file):
+    """Строит миниатюру и набор ширин в WebP и JPEG для иллюстрации.
+
+    Возвращает (имя миниатюры, копии): копии — словарь с размерами
+    оригинала ('width', 'height') и списками [[ширина, имя], ...]
+    по возрастанию ширины для каждого формата.
+    """
+    storage = image_file.storage
+    directory = PurePosixPath(DERIVED_DIR, content_hash(image_file))
+    image_file.open('rb')
+    try:
+        with Image.open(image_file) as original:
+            image = ImageOps.exif_transpose(original).convert('RGB')
+    finally:
+        image_file.close()
+
+    def thumbnail():
+        small = image.copy()
+        small.thumbnail((ADMIN_THUMBNAIL_SIZE, ADMIN_THUMBNAIL_SIZE))
+        return encode(small, 'JPEG', quality=80, optimize=True)
+
+    thumbnail_name = save_derived(
+        storage,
+        str(directory / f'thumb_{ADMIN_THUMBNAIL_SIZE}.jpg'),
+        thumbnail,
+    )
+    variants = {'width': image.width, 'height': image.height}
+    variants.update((key, []) for key, *_ in FORMATS)
+    for width in variant_widths(image.width):
+        copy = resized(image, width) if width != image.width else image
+        for key, pil_format, extension, options in FORMATS:
+            name = save_derived(
+                storage,
+                str(directory / f'{width}.{extension}'),
+                lambda: encode(copy, pil_format, **options),
+            )
+            variants[key].append([width, name])
+    return thumbnail_name, variants
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.tasks import process_post_image
+
+
+class Command(BaseCommand):
+    """Строит уменьшенные копии иллюстраций для уже загруженных постов.
+
+    Новые иллюстрации обрабатывает фоновый воркер (run_worker); команда
+    нужна для постов, загруженных до появления копий, и выполняет ту же
+    обработку сразу. Копии лежат по хешу содержимого, так что повторный
+    запуск ничего не пересчитывает.
+    """
+
+    help = 'Строит миниатюры и копии для srcset у иллюстраций постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Обработать и посты, у которых копии уже есть.',
+        )
+
+    def handle(self, *args, force, **options):
+        posts = Post.objects.exclude(image='').only('image')
+        if not force:
+            posts = posts.filter(image_variants={})
+        built = 0
+        for post in posts.iterator():
+            process_post_image(post.pk, post.image.name)
+            built += 1
+        self.stdout.write(f'Обработано иллюстраций: {built}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blog.search import rebuild_index
+from blogicum.const import SEARCH_REBUILD_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Заново заполняет полнотекстовый индекс публикаций.
+
+    Сигналы обновляют индекс при каждом сохранении поста, но не видят
+    массовых update() и загрузки дампов — после них и для первичной
+    загрузки индекс пересобирается этой командой.
+    """
+
+    help = 'Пересобирает полнотекстовый индекс публикаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEARCH_REBUILD_BATCH_SIZE,
+            help='Сколько публикаций индексировать за один запрос.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        indexed = rebuild_index(batch_size)
+        self.stdout.write(f'Проиндексировано публикаций: {indexed}')
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    """Пересчитывает Post.comment_count и чинит расхождения.
+
+    Счётчик меняют сигналы комментариев (blog.signals), но он может
+    разойтись с реальностью после массовых правок в обход сигналов
+    (bulk_create, update(), raw SQL).
+    Публикации обрабатываются пачками по диапазону id, обновляются
+    только те, у которых счётчик не совпадает с фактическим числом.
+    """
+
+    help = 'Пересчитывает счётчики комментариев у публикаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Сколько публикаций проверять за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать расхождения, ничего не меняя.',
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        actual = Coalesce(
+            Subquery(
+                Comment.objects.filter(
+                    post=OuterRef('pk')
+                ).order_by().values('post').annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0,
+        )
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        repaired = 0
+        for start in range(0, last_pk + 1, batch_size):
+            drifted = Post.objects.filter(
+                pk__gte=start, pk__lt=start + batch_size
+            ).filter(~Q(comment_count=actual))
+            if dry_run:
+                repaired += drifted.count()
+                continue
+            with transaction.atomic():
+                repaired += drifted.update(comment_count=actual)
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(f'{verb} расхождений: {repaired}')
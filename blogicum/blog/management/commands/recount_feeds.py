@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from blog.models import FeedCounter, Post
+
+
+class Command(BaseCommand):
+    """Пересчитывает счётчики лент FeedCounter.
+
+    Счётчики меняются сигналами публикаций, но расходятся с
+    реальностью после массовых update(), удаления категорий и ручных
+    запросов. Команда считает все ленты заново группировкой и
+    обновляет только разошедшиеся счётчики.
+    """
+
+    help = 'Пересчитывает число публикаций в лентах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать расхождения, ничего не меняя.',
+        )
+
+    def handle(self, *args, dry_run, **options):
+        actual = self.count_feeds()
+        stored = {
+            (scope, key): count
+            for scope, key, count in FeedCounter.objects.values_list(
+                'scope', 'key', 'count'
+            )
+        }
+        drifted = {
+            counter: actual.get(counter, 0)
+            for counter in actual.keys() | stored.keys()
+            if actual.get(counter, 0) != stored.get(counter)
+        }
+        if not dry_run:
+            with transaction.atomic():
+                FeedCounter.objects.bulk_create(
+                    [
+                        FeedCounter(scope=scope, key=key)
+                        for scope, key in drifted
+                    ],
+                    ignore_conflicts=True,
+                )
+                for (scope, key), count in drifted.items():
+                    FeedCounter.objects.filter(
+                        scope=scope, key=key
+                    ).update(count=count)
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(f'{verb} расхождений: {len(drifted)}')
+
+    def count_feeds(self):
+        posts = Post.objects.order_by()
+        public = posts.filter(is_published=True, pub_date__isnull=False)
+        counts = {(FeedCounter.SITE, 0): public.count()}
+        for scope, queryset, field in (
+            (FeedCounter.AUTHOR_ALL, posts, 'author_id'),
+            (FeedCounter.AUTHOR, public, 'author_id'),
+            (
+                FeedCounter.CATEGORY,
+                public.filter(category__isnull=False),
+                'category_id',
+            ),
+        ):
+            for row in queryset.values(field).annotate(total=Count('pk')):
+                counts[scope, row[field]] = row['total']
+        return counts
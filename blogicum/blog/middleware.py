@@ -0,0 +1,164 @@
+import hashlib
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from blogicum.const import (PAGE_CACHE_LOCK_WAIT, PAGE_CACHE_RENDER_TIMEOUT,
+                            PAGE_CACHE_STALE_TIMEOUT, PAGE_CACHE_TIMEOUT)
+from core import routers
+from core.locks import POLL_INTERVAL
+
+from .cache import (AUTHOR_FEED, CATEGORY_FEED, FEED, PAGE_KEY, PAGE_LEASE_KEY,
+                    get_generations)
+from .schedule import visible_before
+
+# Области лент: их поколения меняются и в момент выхода отложенной
+# публикации (blog.schedule.visible_before).
+FEED_SCOPES = (FEED, CATEGORY_FEED, AUTHOR_FEED)
+
+
+def is_fresh(entry):
+    """Копия свежа, пока не истёк её срок и не сменилось ни одно
+    поколение, с которыми она рендерилась.
+    """
+    if entry['fresh_until'] <= time.time():
+        return False
+    deps = entry['generations']
+    if any(scope in FEED_SCOPES for scope, _ in deps):
+        # Сдвигает поколения лент, если отложенная публикация уже вышла.
+        visible_before()
+    return get_generations(*deps) == list(deps.values())
+
+
+def cached_response(request, entry):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    return get_conditional_response(
+        request, etag=response.get('ETag'), response=response
+    ) or response
+
+
+class RenderLease:
+    """Право одного запроса перерисовать страницу, ключ в общем кэше.
+
+    У каждой страницы свой ключ, так что холодные рендеры разных страниц
+    друг друга не ждут, а cache.add отдаёт его первому запросу во всех
+    процессах. Если рендеривший процесс умер, ключ истекает через
+    PAGE_CACHE_RENDER_TIMEOUT секунд.
+    """
+
+    def __init__(self, digest):
+        self.key = PAGE_LEASE_KEY.format(digest=digest)
+        self.token = uuid4().hex
+
+    def acquire(self, blocking=True, timeout=None):
+        """Берёт право на рендеринг; без blocking или по истечении
+        timeout секунд возвращает False, если его держит другой запрос.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not cache.add(self.key, self.token, PAGE_CACHE_RENDER_TIMEOUT):
+            if not blocking or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def release(self):
+        # Истёкший ключ мог уже взять другой запрос.
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+class PageCacheMiddleware:
+    """Кэш целых страниц из PAGE_CACHE_VIEWS для анонимных читателей.
+
+    Ключ — путь вместе с query string. Авторизованные пользователи кэш
+    не используют: у них своя шапка и свои черновики. Копия живёт под
+    теми же поколениями, что и ETag страницы (ConditionalGetMixin), так
+    что сигналы моделей blog делают её устаревшей сразу.
+
+    Устаревшую копию перерисовывает один запрос, взявший RenderLease
+    страницы, а остальные до PAGE_CACHE_STALE_TIMEOUT
+    получают старую (stale-while-revalidate). Если копии нет вовсе,
+    остальные ждут чужого рендеринга до PAGE_CACHE_LOCK_WAIT секунд.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.page_cache_key = None
+        request.page_cache_lock = None
+        try:
+            response = self.get_response(request)
+            if request.page_cache_key is not None and self.is_cacheable(
+                request, response
+            ):
+                self.store(request.page_cache_key, request, response)
+        finally:
+            if request.page_cache_lock is not None:
+                request.page_cache_lock.release()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.resolver_match.view_name
+            not in settings.PAGE_CACHE_VIEWS
+            or request.user.is_authenticated
+        ):
+            return None
+        digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = PAGE_KEY.format(digest=digest)
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry):
+            return cached_response(request, entry)
+        if request.method == 'HEAD':
+            # Тело ответа на HEAD пустое, сохранять нечего.
+            return None
+        lease = RenderLease(digest)
+        if lease.acquire(
+            blocking=entry is None, timeout=PAGE_CACHE_LOCK_WAIT
+        ):
+            request.page_cache_lock = lease
+            if entry is None:
+                # Пока ждали своей очереди, страницу мог отрендерить другой.
+                entry = cache.get(key)
+                if entry is not None:
+                    return cached_response(request, entry)
+        elif entry is not None:
+            return cached_response(request, entry)
+        # Копия ляжет под текущие поколения: рендерим её по основной
+        # базе, а не по реплике, которая может ещё не знать о записи.
+        routers.use_replicas(False)
+        request.page_cache_key = key
+        return None
+
+    def is_cacheable(self, request, response):
+        # Ответы с cookie (CSRF, сессия) принадлежат одному клиенту.
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+            and hasattr(request, 'page_generations')
+        )
+
+    def store(self, key, request, response):
+        cache.set(
+            key,
+            {
+                'content': response.content,
+                'status': response.status_code,
+                'headers': list(response.items()),
+                'generations': request.page_generations,
+                'fresh_until': time.time() + PAGE_CACHE_TIMEOUT,
+            },
+            PAGE_CACHE_TIMEOUT + PAGE_CACHE_STALE_TIMEOUT,
+        )
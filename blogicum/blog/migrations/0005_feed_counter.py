@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:34
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_feed_counters(apps, schema_editor):
+    FeedCounter = apps.get_model('blog', 'FeedCounter')
+    Post = apps.get_model('blog', 'Post')
+    db_alias = schema_editor.connection.alias
+    posts = Post.objects.using(db_alias).order_by()
+    public = posts.filter(is_published=True, pub_date__isnull=False)
+    counters = [FeedCounter(scope='site', key=0, count=public.count())]
+    for scope, queryset, field in (
+        ('author_all', posts, 'author_id'),
+        ('author', public, 'author_id'),
+        ('category', public.filter(category__isnull=False), 'category_id'),
+    ):
+        counters += [
+            FeedCounter(scope=scope, key=row[field], count=row['total'])
+            for row in queryset.values(field).annotate(total=Count('pk'))
+        ]
+    FeedCounter.objects.using(db_alias).bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=16, verbose_name='Лента')),
+                ('key', models.PositiveIntegerField(default=0, verbose_name='Ключ')),
+                ('count', models.IntegerField(default=0, verbose_name='Публикаций')),
+            ],
+            options={
+                'verbose_name': 'счётчик ленты',
+                'verbose_name_plural': 'Счётчики лент',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedcounter',
+            constraint=models.UniqueConstraint(fields=('scope', 'key'), name='feed_counter_unique'),
+        ),
+        migrations.RunPython(fill_feed_counters, migrations.RunPython.noop),
+    ]
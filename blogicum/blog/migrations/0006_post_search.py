@@ -0,0 +1,55 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:38
+
+import blog.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # unicode61 приводит к нижнему регистру и кириллицу.
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE blog_post_fts USING fts5('
+        "title, text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # Совпадение в заголовке весит в 10 раз больше, чем в тексте.
+    schema_editor.execute(
+        'INSERT INTO blog_post_fts (blog_post_fts, rank)'
+        " VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+    schema_editor.execute(
+        'INSERT INTO blog_post_fts (rowid, title, text)'
+        " SELECT id, title, COALESCE(text, '') FROM blog_post"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE blog_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_feed_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='blog.post')),
+                ('title', models.TextField()),
+                ('text', models.TextField()),
+                ('document', blog.models.SearchField(db_column='blog_post_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'blog_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,11 +1,23 @@
+import hashlib
+
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.db.models import Count
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+
+from blogicum.const import POST_CACHE_TIMEOUT
 
+from .cache import (AUTHOR, CATEGORY, FEED, LOCATION, POST, get_generations,
+                    get_or_set_with_deps, scoped_key)
 from .forms import CommentForm, PostForm
-from .models import Comment, Post
+from .models import Comment, FeedCounter, Post
+from .pagination import (AFTER, BEFORE, CachedPaginator, CursorPaginator,
+                         encode_cursor)
+from .schedule import visible_before
 
 
 class OnlyAuthorMixin(UserPassesTestMixin):
@@ -52,23 +64,241 @@ class PostBaseMixin:
     pk_url_kwarg = 'post_id'
 
 
+class MemoizedObjectMixin:
+    """Миксин запоминает объект страницы на время запроса.
+
+    Методы:
+    ________
+    - get_object - возвращает объект, загружая его не больше раза
+    за запрос, сколько бы раз его ни спрашивали
+    - load_object - собственно загрузка; по умолчанию get_object
+    следующего класса в MRO
+    """
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return self.load_object(queryset)
+        if not hasattr(self, '_memoized_object'):
+            self._memoized_object = self.load_object()
+        return self._memoized_object
+
+    def load_object(self, queryset=None):
+        return super().get_object(queryset)
+
+
+class VisiblePostMixin:
+    """Миксин достаёт публикацию из URL с учётом её видимости.
+
+    Методы:
+    ________
+    - get_post_queryset - пост вместе с автором, категорией и местом,
+    которые выводит шаблон, одним запросом
+    - get_post - пост из кэша или БД; читателям, в отличие от автора,
+    неопубликованный пост не показывается (404). Видимость проверяется
+    в Python по уже загруженным полям, без второго запроса с фильтрами.
+    """
+
+    def get_post_queryset(self):
+        return Post.objects.select_related('author', 'category', 'location')
+
+    def get_post(self):
+        post_id = self.kwargs['post_id']
+        post = get_or_set_with_deps(
+            scoped_key('post_detail', ((POST, post_id),)),
+            lambda: get_object_or_404(self.get_post_queryset(), pk=post_id),
+            lambda post: (
+                (AUTHOR, post.author_id),
+                (CATEGORY, post.category_id),
+                (LOCATION, post.location_id),
+            ),
+            POST_CACHE_TIMEOUT,
+        )
+        if post.author_id != self.request.user.pk and not post.is_visible():
+            raise Http404
+        return post
+
+
 class BaseQuerysetMixin:
     """Миксин содержит основные фильтры для постов и комментов."""
 
     def get_queryset(self):
-        return Post.objects.prefetch_related(
-            'author', 'location', 'category'
-        ).filter(
+        # Граница нужна только для того, чтобы вовремя сдвинуть поколения
+        # лент: кэш не знает об отложенных постах, записанных другим
+        # процессом или через bulk_create/update(), поэтому условие
+        # видимости остаётся настоящим.
+        visible_before()
+        return Post.objects.for_cards().filter(
             pub_date__lt=timezone.now(),
             is_published=True,
             category__is_published=True,
         ).order_by(
-            '-pub_date'
-        ).annotate(
-            comment_count=Count('comments')
+            '-pub_date', '-pk'
         ).all()
 
 
+class CursorPaginationMixin:
+    """Миксин добавляет ListView курсорную (keyset) пагинацию.
+
+    Атрибуты:
+    __________
+    cursor_kwarg - GET-параметр с курсором
+
+    Без курсора в запросе работает обычная пагинация по ?page=N,
+    но ссылки «вперёд/назад» и в этом случае ведут на курсоры,
+    чтобы глубокие страницы не требовали OFFSET и COUNT(*).
+    """
+
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if cursor is None:
+            paginator, page, object_list, is_paginated = (
+                super().paginate_queryset(queryset, page_size)
+            )
+            page.next_cursor = (
+                encode_cursor(AFTER, page[-1])
+                if page and page.has_next() else None
+            )
+            page.previous_cursor = (
+                encode_cursor(BEFORE, page[0])
+                if page and page.has_previous() else None
+            )
+            return paginator, page, object_list, is_paginated
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        try:
+            page = paginator.page(cursor)
+        except InvalidPage as error:
+            raise Http404(str(error))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_cursor_paginator(self, queryset, per_page):
+        return CursorPaginator(queryset, per_page)
+
+
+class ConditionalGetMixin:
+    """Миксин отвечает 304 Not Modified, если у клиента свежая страница.
+
+    Методы:
+    ________
+    - get_page_scopes - области (scope, pk), от которых зависит HTML
+    страницы: её лента и выведенные объекты. Считаются по уже собранному
+    контексту, до рендеринга шаблона
+    - get_etag_parts - всё остальное, что меняет страницу, но не
+    отражается в поколениях
+    - get_etag - слабый ETag из поколений областей, этих частей,
+    текущего пользователя и его CSRF-токена: шапка у каждого своя, автор
+    видит в профиле и у поста больше, чем читатели, а формы страницы
+    годятся только с действующим токеном
+    """
+
+    def get_page_scopes(self, context):
+        return ()
+
+    def get_etag_parts(self, context):
+        return ()
+
+    def get_etag(self, context, generations):
+        user = self.request.user
+        parts = [
+            user.pk,
+            user.get_username(),
+            *generations.items(),
+            *self.get_etag_parts(context),
+        ]
+        if user.is_authenticated:
+            # В страницах пользователя есть формы с {% csrf_token %}:
+            # после повторного входа токен другой, и старая копия
+            # из кэша браузера получила бы 403 на первой же форме.
+            get_token(self.request)
+            parts.append(self.request.META['CSRF_COOKIE'])
+        digest = hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def render_to_response(self, context, **response_kwargs):
+        scopes = tuple(self.get_page_scopes(context))
+        generations = dict(zip(scopes, get_generations(*scopes)))
+        # По этим же поколениям кэш страниц (blog.middleware) решает,
+        # не устарела ли сохранённая копия.
+        self.request.page_generations = generations
+        etag = self.get_etag(context, generations)
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = super().render_to_response(context, **response_kwargs)
+        response['ETag'] = etag
+        return response
+
+
+class FeedCacheMixin(ConditionalGetMixin):
+    """Миксин кэширует страницы ленты под поколениями её областей.
+
+    Методы:
+    ________
+    - get_cache_scopes - области (scope, pk), при изменении которых
+    страницы этой ленты устаревают
+    - get_cache_variant - различает ленты одной области,
+    например профиль глазами автора и глазами читателя
+    - get_counter_key - (scope, key) счётчика FeedCounter, которым
+    пагинатор заменяет COUNT(*) длинной ленты
+    - get_page_scopes - области ленты (состав и число страниц) и всех
+    карточек её страницы
+    """
+
+    paginator_class = CachedPaginator
+
+    def get_cache_scopes(self):
+        return ((FEED, None),)
+
+    def get_cache_variant(self):
+        return ''
+
+    def get_counter_key(self):
+        return (FeedCounter.SITE, 0)
+
+    def get_count_estimate(self):
+        return FeedCounter.objects.get_count(*self.get_counter_key())
+
+    def get_cache_kwargs(self):
+        return {
+            'cache_scopes': self.get_cache_scopes(),
+            'cache_variant': self.get_cache_variant(),
+        }
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset,
+            per_page,
+            count_estimate=self.get_count_estimate,
+            **self.get_cache_kwargs(),
+            **kwargs,
+        )
+
+    def get_cursor_paginator(self, queryset, per_page):
+        return CursorPaginator(queryset, per_page, **self.get_cache_kwargs())
+
+    def get_page_scopes(self, context):
+        scopes = list(self.get_cache_scopes())
+        for post in context['page_obj']:
+            scopes += [
+                (POST, post.pk),
+                (AUTHOR, post.author_id),
+                (CATEGORY, post.category_id),
+                (LOCATION, post.location_id),
+            ]
+        return scopes
+
+    def get_etag_parts(self, context):
+        # Число комментариев меняется вместе с поколением поста,
+        # а готовность копий иллюстрации — нет (см. post_card_key).
+        return (
+            self.get_cache_variant(),
+            *(
+                (post.pk, bool(post.image_variants))
+                for post in context['page_obj']
+            ),
+        )
+
+
 class UrlProfileMixin():
     """Миксин переадресует на страницу Profile."""
 
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Substr
 from django.urls import reverse
+from django.utils import timezone
 
-from blogicum.const import MAXLENGTH, VISIBLE_LENGTH
+from blogicum.const import MAXLENGTH, TEXT_PREVIEW_LENGTH, VISIBLE_LENGTH
 from core.models import PublishedModel
 
 User = get_user_model()
@@ -52,6 +54,34 @@ class Location(PublishedModel):
         return self.name[:VISIBLE_LENGTH]
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_cards(self):
+        """Ровно то, что выводит includes/post_card.html, одним запросом.
+
+        Связи подтягиваются JOIN-ом, а вместо полного текста выбирается
+        его начало — карточка всё равно показывает первые слова.
+        """
+        return self.select_related(
+            'author', 'category', 'location'
+        ).only(
+            'title',
+            'pub_date',
+            'is_published',
+            'image',
+            'image_variants',
+            'comment_count',
+            'author__username',
+            'category__title',
+            'category__slug',
+            'category__is_published',
+            'location__name',
+            'location__is_published',
+        ).annotate(
+            text_preview=Substr('text', 1, TEXT_PREVIEW_LENGTH)
+        )
+
+
 class Post(PublishedModel):
     """Модель публикации."""
 
@@ -95,22 +125,184 @@ class Post(PublishedModel):
         upload_to='posts_images',
         blank=True
     )
+    # Путь к заранее подготовленной миниатюре image в том же хранилище,
+    # для списка публикаций в админке.
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
+    # Уменьшенные копии image для srcset (blog.images.build_derivatives):
+    # {'webp': [[ширина, путь], ...], 'jpeg': [...]}.
+    image_variants = models.JSONField(
+        'Копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    # Хранимый счётчик комментариев вместо Count('comments') в лентах.
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        indexes = (
+            # Лента главной страницы: опубликованные посты по дате.
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_published_feed_idx',
+                condition=models.Q(is_published=True),
+            ),
+            # Лента категории.
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                name='post_category_feed_idx',
+                condition=models.Q(is_published=True),
+            ),
+            # Профиль: автор видит и неопубликованные посты.
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title[:VISIBLE_LENGTH]
 
+    @property
+    def thumbnail_url(self):
+        if self.thumbnail:
+            return self.image.storage.url(self.thumbnail)
+
+    def is_visible(self):
+        """Видна ли публикация читателям, а не только автору."""
+        return (
+            self.is_published
+            and self.pub_date is not None
+            and self.pub_date < timezone.now()
+            and self.category is not None
+            and self.category.is_published
+        )
+
     def get_absolute_url(self):
         return reverse('blog:post_detail',
                        kwargs={'post_id': self.kwargs['post_id']}
                        )
 
 
+class SearchField(models.TextField):
+    """Скрытый столбец FTS5-таблицы с её же именем: по нему идёт MATCH."""
+
+
+@SearchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearch(models.Model):
+    """Полнотекстовый индекс FTS5 по заголовку и тексту публикаций.
+
+    Таблица создаётся миграцией и заполняется сигналами (blog.search),
+    модель нужна только для JOIN по rowid = id публикации.
+    rank — bm25 с весом заголовка выше текста.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search',
+    )
+    title = models.TextField()
+    text = models.TextField()
+    document = SearchField(db_column='blog_post_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'blog_post_fts'
+
+
+class FeedCounterQuerySet(models.QuerySet):
+
+    def adjust(self, keys, delta):
+        """Сдвигает на delta счётчики лент с ключами (scope, key)."""
+        if not keys or not delta:
+            return
+        self.bulk_create(
+            [FeedCounter(scope=scope, key=key) for scope, key in keys],
+            ignore_conflicts=True,
+        )
+        condition = models.Q()
+        for scope, key in keys:
+            condition |= models.Q(scope=scope, key=key)
+        self.filter(condition).update(count=models.F('count') + delta)
+
+    def get_count(self, scope, key=0):
+        return self.filter(scope=scope, key=key).values_list(
+            'count', flat=True
+        ).first()
+
+
+class FeedCounter(models.Model):
+    """Поддерживаемое сигналами число публикаций в ленте.
+
+    Счётчик — оценка: он не учитывает отложенные публикации и снятые
+    с публикации категории. Пагинатор берёт его, только когда точный
+    COUNT(*) ленты оказывается слишком дорогим.
+    """
+
+    SITE = 'site'
+    CATEGORY = 'category'
+    AUTHOR = 'author'
+    # Профиль глазами автора: все его публикации.
+    AUTHOR_ALL = 'author_all'
+
+    scope = models.CharField('Лента', max_length=16)
+    # id категории или автора; у общей ленты — 0.
+    key = models.PositiveIntegerField('Ключ', default=0)
+    count = models.IntegerField('Публикаций', default=0)
+
+    objects = FeedCounterQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'счётчик ленты'
+        verbose_name_plural = 'Счётчики лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('scope', 'key'), name='feed_counter_unique'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.scope}:{self.key} = {self.count}'
+
+    @classmethod
+    def keys_for(cls, author_id, category_id, is_published, pub_date):
+        """Ключи счётчиков, в которые входит публикация с такими полями."""
+        keys = [(cls.AUTHOR_ALL, author_id)]
+        if is_published and pub_date is not None:
+            keys += [(cls.SITE, 0), (cls.AUTHOR, author_id)]
+            if category_id is not None:
+                keys.append((cls.CATEGORY, category_id))
+        return keys
+
+
 class Comment(models.Model):
     text = models.TextField('Комментарий')
     post = models.ForeignKey(
@@ -130,9 +322,22 @@ class Comment(models.Model):
         verbose_name_plural = 'Комментарии'
         ordering = ('created_at',)
         default_related_name = 'comments'
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self):
+        # Публикацию выводим, только если она уже загружена
+        # (select_related): иначе каждый комментарий в списке
+        # стоил бы отдельного запроса.
+        if Comment.post.is_cached(self):
+            post = self.post
+        else:
+            post = f'#{self.post_id}'
         return (
             f'Комментарий: {self.text[:VISIBLE_LENGTH]}.'
-            f'Публикация:{self.post}'
+            f'Публикация:{post}'
         )
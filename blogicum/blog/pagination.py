@@ -0,0 +1,378 @@
+import base64
+import binascii
+import hashlib
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+from blogicum.const import (ADMIN_COUNT_CACHE_TIMEOUT, FEED_CACHE_TIMEOUT,
+                            FEED_EXACT_COUNT_LIMIT)
+
+from .cache import get_or_set, scoped_key
+
+# Направления перехода, которые кодируются в курсоре.
+AFTER = 'a'
+BEFORE = 'b'
+
+
+class InvalidCursor(InvalidPage):
+    """Курсор не удалось разобрать."""
+
+    pass
+
+
+def encode_cursor(direction, obj, field='pub_date'):
+    """Собирает непрозрачный курсор из (значение поля, id) объекта."""
+    value = getattr(obj, field)
+    if value is None:
+        value = ''
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    else:
+        value = repr(value)
+    raw = f'{direction}|{value}|{obj.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    """Возвращает кортеж (направление, значение поля, id) из курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        ).decode()
+        direction, value, pk = raw.split('|')
+        if direction not in (AFTER, BEFORE):
+            raise ValueError(direction)
+        return (
+            direction,
+            parse(value) if value else None,
+            int(pk),
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise InvalidCursor('Некорректный курсор') from error
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    В отличие от django.core.paginator.Page не знает ни своего номера,
+    ни общего числа страниц — поэтому и не требует COUNT(*).
+    """
+
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage: {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(
+                AFTER, self.object_list[-1], self.paginator.cursor_field
+            )
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(
+                BEFORE, self.object_list[0], self.paginator.cursor_field
+            )
+
+
+class ScopedCacheMixin:
+    """Кэширует страницы пагинатора под поколениями областей ленты.
+
+    В кэш кладутся только id публикаций страницы: при попадании строки
+    достаются одним запросом по первичному ключу, а карточки всё равно
+    рендерятся из своего кэша фрагментов.
+    Без cache_scopes пагинатор работает как обычно.
+    """
+
+    def __init__(self, *args, cache_scopes=(), cache_variant='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_scopes = tuple(cache_scopes)
+        self.cache_variant = cache_variant
+
+    def cache_key(self, name, *parts):
+        return scoped_key(
+            name, self.cache_scopes, self.cache_variant, self.per_page, *parts
+        )
+
+    def cached(self, name, compute, *parts):
+        if not self.cache_scopes:
+            return compute()
+        return get_or_set(
+            self.cache_key(name, *parts), compute, FEED_CACHE_TIMEOUT
+        )
+
+    def cached_rows(self, name, compute, *parts):
+        """compute() возвращает (строки, доп. данные страницы)."""
+        if not self.cache_scopes:
+            return compute()
+        computed = []
+
+        def compute_ids():
+            rows, extra = compute()
+            computed.append(rows)
+            return [row.pk for row in rows], extra
+
+        ids, extra = get_or_set(
+            self.cache_key(name, *parts), compute_ids, FEED_CACHE_TIMEOUT
+        )
+        if computed:
+            return computed[0], extra
+        rows = self.object_list.in_bulk(ids)
+        return [rows[pk] for pk in ids if pk in rows], extra
+
+
+class CachedPaginator(ScopedCacheMixin, Paginator):
+    """Постраничный пагинатор с кэшем числа публикаций и страниц.
+
+    С count_estimate точный COUNT(*) не идёт дальше count_limit строк:
+    у лент длиннее число публикаций берётся из оценки (счётчика ленты),
+    а дальние страницы по-прежнему доступны по курсору. Оценка
+    учитывает и отложенные посты, поэтому хвост ленты по ней не
+    выводится: его «страницы» могли бы оказаться пустыми OFFSET далеко
+    за концом настоящих данных.
+    """
+
+    count_limit = FEED_EXACT_COUNT_LIMIT
+
+    def __init__(self, *args, count_estimate=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_estimate = count_estimate
+
+    @cached_property
+    def count(self):
+        return self.cached('count', self._count)
+
+    def _count(self):
+        if self.count_estimate is None:
+            return super().count
+        bounded = self.object_list.order_by().values('pk')[
+            :self.count_limit + 1
+        ].count()
+        if bounded <= self.count_limit:
+            return bounded
+        return max(self.count_estimate() or 0, bounded)
+
+    @property
+    def count_is_estimated(self):
+        return self.count_estimate is not None and (
+            self.count > self.count_limit
+        )
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3, on_ends=2):
+        if not self.count_is_estimated:
+            yield from super().get_elided_page_range(
+                number, on_each_side=on_each_side, on_ends=on_ends
+            )
+            return
+        # Без последних страниц: дальше окна ведёт курсор «вперёд».
+        number = self.validate_number(number)
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        yield from range(
+            number + 1, min(number + on_each_side, self.num_pages) + 1
+        )
+        if number + on_each_side < self.num_pages:
+            yield self.ELLIPSIS
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        rows, _ = self.cached_rows(
+            'page',
+            lambda: (list(self.object_list[bottom:top]), None),
+            number,
+        )
+        return self._get_page(rows, number, self)
+
+
+class AdminCountPaginator(Paginator):
+    """Пагинатор списков админки с числом строк из кэша.
+
+    Ключ — хеш SQL запроса, так что у каждого сочетания фильтров
+    и поиска свой счётчик. Число может отставать от базы не дольше
+    ADMIN_COUNT_CACHE_TIMEOUT секунд.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        key = 'blog:admin_count:' + hashlib.md5(sql.encode()).hexdigest()
+        return get_or_set(
+            key,
+            lambda: super(AdminCountPaginator, self).count,
+            ADMIN_COUNT_CACHE_TIMEOUT,
+        )
+
+
+class CursorPaginator(ScopedCacheMixin):
+    """Keyset-пагинатор публикаций по ключу (pub_date, id).
+
+    Страница выбирается условием «строго после/до курсора», а не OFFSET,
+    поэтому стоимость запроса не зависит от глубины страницы.
+    Публикации без даты идут в конце ленты, как при order_by('-pub_date').
+    """
+
+    cursor_field = 'pub_date'
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(**kwargs)
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def page(self, cursor):
+        direction, pub_date, pk = decode_cursor(cursor)
+        rows, has_more = self.cached_rows(
+            'cursor',
+            lambda: self._fetch(direction, pub_date, pk),
+            direction, pub_date and pub_date.timestamp(), pk,
+        )
+        if direction == AFTER:
+            return CursorPage(rows, self, has_more, True)
+        return CursorPage(rows, self, True, has_more)
+
+    def _fetch(self, direction, pub_date, pk):
+        if direction == AFTER:
+            if pub_date is None:
+                condition = Q(pub_date__isnull=True, pk__lt=pk)
+            else:
+                condition = (
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, pk__lt=pk)
+                    | Q(pub_date__isnull=True)
+                )
+            ordering = (F('pub_date').desc(nulls_last=True), '-pk')
+        else:
+            if pub_date is None:
+                condition = (
+                    Q(pub_date__isnull=False)
+                    | Q(pub_date__isnull=True, pk__gt=pk)
+                )
+            else:
+                condition = (
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, pk__gt=pk)
+                )
+            ordering = (F('pub_date').asc(nulls_first=True), 'pk')
+        rows = list(
+            self.object_list.filter(condition).order_by(
+                *ordering
+            )[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BEFORE:
+            rows.reverse()
+        return rows, has_more
+
+
+class CommentPaginator:
+    """Курсорная пагинация комментариев «от старых к новым».
+
+    Ключ — (created_at, id); страницы подгружаются только вперёд,
+    так что память и время страницы поста не растут с числом
+    комментариев.
+    """
+
+    cursor_field = 'created_at'
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def page(self, cursor=None):
+        comments = self.object_list.order_by('created_at', 'pk')
+        if cursor is not None:
+            direction, created_at, pk = decode_cursor(cursor)
+            if direction != AFTER or created_at is None:
+                raise InvalidCursor('Некорректный курсор')
+            comments = comments.filter(
+                Q(created_at__gt=created_at)
+                | Q(created_at=created_at, pk__gt=pk)
+            )
+        rows = list(comments[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page],
+            self,
+            len(rows) > self.per_page,
+            cursor is not None,
+        )
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов поиска по (релевантность, id).
+
+    Релевантность (bm25) отрицательна: чем меньше, тем выше результат,
+    поэтому лента идёт по возрастанию search_rank.
+    """
+
+    cursor_field = 'search_rank'
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def page(self, cursor=None):
+        results = self.object_list
+        direction = AFTER
+        if cursor is not None:
+            direction, rank, pk = decode_cursor(cursor, parse=float)
+            if rank is None:
+                raise InvalidCursor('Некорректный курсор')
+            if direction == AFTER:
+                results = results.filter(
+                    Q(search_rank__gt=rank) | Q(search_rank=rank, pk__gt=pk)
+                )
+            else:
+                results = results.filter(
+                    Q(search_rank__lt=rank) | Q(search_rank=rank, pk__lt=pk)
+                )
+        ordering = (
+            ('search_rank', 'pk') if direction == AFTER
+            else ('-search_rank', '-pk')
+        )
+        rows = list(results.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BEFORE:
+            rows.reverse()
+            return CursorPage(rows, self, True, has_more)
+        return CursorPage(rows, self, has_more, cursor is not None)
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from blogicum.const import FEED_CACHE_TIMEOUT
+
+from .cache import AUTHOR_FEED, CATEGORY_FEED, FEED, bump_generations
+from .models import Post
+
+NEXT_PUBLICATION_KEY = 'blog:next_publication'
+
+# В кэше «отложенных публикаций нет» хранится как False:
+# None означает, что граница ещё не посчитана.
+NOTHING_SCHEDULED = False
+
+
+def find_next_publication(now):
+    return Post.objects.filter(
+        is_published=True, pub_date__gt=now
+    ).aggregate(next=Min('pub_date'))['next'] or NOTHING_SCHEDULED
+
+
+def publish_due(since, now):
+    """Устаревают ленты, в которые попали посты, ставшие видимыми."""
+    due = Post.objects.filter(
+        is_published=True, pub_date__gte=since, pub_date__lte=now
+    ).values_list('author_id', 'category__slug').distinct()
+    scopes = [(FEED, None)]
+    for author_id, slug in due:
+        scopes += [(AUTHOR_FEED, author_id), (CATEGORY_FEED, slug)]
+    if len(scopes) > 1:
+        bump_generations(*scopes)
+
+
+def visible_before():
+    """Момент ближайшей отложенной публикации.
+
+    Состав лент меняется только в такие моменты, поэтому закэшированные
+    ленты верны до ближайшего из них. Первый запрос после границы
+    инвалидирует ленты постов, ставших видимыми, и сдвигает границу
+    дальше. Сами ленты по-прежнему фильтруются по timezone.now():
+    граница решает только, когда сдвигать поколения.
+    Возвращает None, если отложенных публикаций нет.
+    """
+    now = timezone.now()
+    boundary = cache.get(NEXT_PUBLICATION_KEY)
+    if boundary is None:
+        # Граница вытеснена из кэша: закэшированные до этого ленты
+        # живут не дольше FEED_CACHE_TIMEOUT, их и проверяем.
+        publish_due(now - timedelta(seconds=FEED_CACHE_TIMEOUT), now)
+    elif boundary is NOTHING_SCHEDULED or boundary > now:
+        return boundary or None
+    else:
+        publish_due(boundary, now)
+    boundary = find_next_publication(now)
+    cache.set(NEXT_PUBLICATION_KEY, boundary, None)
+    return boundary or None
+
+
+def schedule_publication(post):
+    """Сдвигает границу назад, если пост запланирован раньше неё.
+
+    Более поздняя граница не мешает: в её момент просто нечего будет
+    инвалидировать и она пересчитается.
+    """
+    if not post.is_published or post.pub_date is None:
+        return
+    if post.pub_date <= timezone.now():
+        return
+    boundary = cache.get(NEXT_PUBLICATION_KEY)
+    if boundary is not None and (
+        boundary is NOTHING_SCHEDULED or post.pub_date < boundary
+    ):
+        cache.set(NEXT_PUBLICATION_KEY, post.pub_date, None)
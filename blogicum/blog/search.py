@@ -0,0 +1,63 @@
+import re
+
+from django.db import connection
+
+from blogicum.const import SEARCH_REBUILD_BATCH_SIZE
+
+SEARCH_TABLE = 'blog_post_fts'
+
+# Слова запроса: всё, кроме пробелов и кавычек.
+WORD = re.compile(r'[^\s"]+')
+
+
+def match_expression(query):
+    """Превращает строку из формы поиска в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 (AND, NEAR,
+    *, -) из пользовательского ввода не разбирались как синтаксис;
+    последнее слово ищется по префиксу. Пустой запрос даёт None.
+    """
+    words = WORD.findall(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, text)'
+            ' VALUES (%s, %s, %s)',
+            [post.pk, post.title, post.text or ''],
+        )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def rebuild_index(batch_size=SEARCH_REBUILD_BATCH_SIZE):
+    """Переиндексирует все публикации пачками по диапазону id."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute('SELECT MAX(id) FROM blog_post')
+        last_pk = cursor.fetchone()[0] or 0
+        for start in range(0, last_pk + 1, batch_size):
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, text)'
+                " SELECT id, title, COALESCE(text, '') FROM blog_post"
+                ' WHERE id >= %s AND id < %s',
+                [start, start + batch_size],
+            )
+        # Сливает сегменты индекса, накопившиеся после вставок.
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,213 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.jobs import enqueue
+
+from .cache import (AUTHOR, AUTHOR_FEED, CATEGORY, CATEGORY_FEED, FEED,
+                    LOCATION, POST, bump_generations, forget_lookups)
+from .models import Category, Comment, FeedCounter, Location, Post
+from .schedule import schedule_publication
+from .search import index_post, unindex_post
+
+User = get_user_model()
+
+# Публикации, которые сейчас удаляются в этом потоке, вместе
+# с комментариями (on_delete=CASCADE).
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+def post_scopes(post_id, author_id, category_id):
+    """Поколения, которые затрагивает изменение публикации."""
+    scopes = [(POST, post_id), (FEED, None), (AUTHOR_FEED, author_id)]
+    slug = Category.objects.filter(
+        pk=category_id
+    ).values_list('slug', flat=True).first()
+    if slug is not None:
+        scopes.append((CATEGORY_FEED, slug))
+    return scopes
+
+
+def post_counter_keys(post):
+    return FeedCounter.keys_for(
+        post.author_id, post.category_id, post.is_published, post.pub_date
+    )
+
+
+@receiver(pre_save, sender=Post)
+def post_before_save(sender, instance, **kwargs):
+    # Публикация могла сменить автора или категорию —
+    # тогда устаревают и прежние ленты.
+    instance._old_scopes = []
+    instance._old_counter_keys = []
+    instance._old_image = None
+    for old in Post.objects.filter(pk=instance.pk).values(
+        'author_id', 'category_id', 'is_published', 'pub_date', 'image'
+    ):
+        instance._old_image = old.pop('image')
+        instance._old_scopes = post_scopes(
+            instance.pk, old['author_id'], old['category_id']
+        )
+        instance._old_counter_keys = FeedCounter.keys_for(**old)
+
+
+@receiver((post_save, post_delete), sender=Post)
+def post_changed(sender, instance, **kwargs):
+    bump_generations(
+        *getattr(instance, '_old_scopes', ()),
+        *post_scopes(instance.pk, instance.author_id, instance.category_id),
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_counted(sender, instance, **kwargs):
+    old = set(instance._old_counter_keys)
+    new = set(post_counter_keys(instance))
+    FeedCounter.objects.adjust(old - new, -1)
+    FeedCounter.objects.adjust(new - old, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncounted(sender, instance, **kwargs):
+    FeedCounter.objects.adjust(post_counter_keys(instance), -1)
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, **kwargs):
+    index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_image_changed(sender, instance, raw=False, **kwargs):
+    # Старые копии больше не подходят: до окончания фоновой обработки
+    # шаблоны показывают новый оригинал.
+    if raw or instance.image.name == instance._old_image:
+        return
+    if instance.thumbnail or instance.image_variants:
+        instance.thumbnail = ''
+        instance.image_variants = {}
+        Post.objects.filter(pk=instance.pk).update(
+            thumbnail='', image_variants={}
+        )
+    if instance.image:
+        enqueue(
+            'blog.post_image',
+            post_id=instance.pk,
+            image_name=instance.image.name,
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_scheduled(sender, instance, **kwargs):
+    schedule_publication(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_before_delete(sender, instance, **kwargs):
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    # Комментарии каскада к этому моменту уже удалены.
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_counted(sender, instance, created, raw=False, **kwargs):
+    # Счётчик ведётся здесь, а не во view: комментарии создаются
+    # и из админки, shell и фикстур.
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncounted(sender, instance, **kwargs):
+    # У удаляемой публикации считать и инвалидировать нечего: без этого
+    # каскад из тысяч комментариев стоил бы тысяч запросов.
+    if instance.post_id in deleting_posts():
+        return
+    # Счётчик мог разойтись с данными (recount_comments чинит это),
+    # а уйти ниже нуля PositiveIntegerField не даст.
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0)
+    )
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # Состав лент не меняется, а число комментариев попадает в карточки,
+    # ETag и кэш страниц через поколение самого поста.
+    if instance.post_id not in deleting_posts():
+        bump_generations((POST, instance.post_id))
+
+
+@receiver((pre_save, pre_delete), sender=Category)
+def category_before_change(sender, instance, **kwargs):
+    # Снятие категории с публикации меняет состав общей ленты
+    # и профилей всех авторов, писавших в неё. Авторов собираем заранее:
+    # при удалении категории у постов обнулится category_id.
+    instance._old_slug = Category.objects.filter(
+        pk=instance.pk
+    ).values_list('slug', flat=True).first() or instance.slug
+    instance._old_scopes = [(CATEGORY_FEED, instance._old_slug)] + [
+        (AUTHOR_FEED, author_id)
+        for author_id in Post.objects.filter(
+            category_id=instance.pk
+        ).values_list('author_id', flat=True).distinct()
+    ]
+
+
+@receiver((post_save, post_delete), sender=Category)
+def category_changed(sender, instance, **kwargs):
+    forget_lookups(
+        'category',
+        instance.slug,
+        getattr(instance, '_old_slug', instance.slug),
+    )
+    bump_generations(
+        *getattr(instance, '_old_scopes', ()),
+        (CATEGORY, instance.pk),
+        (CATEGORY_FEED, instance.slug),
+        (FEED, None),
+    )
+
+
+@receiver((post_save, post_delete), sender=Location)
+def location_changed(sender, instance, **kwargs):
+    bump_generations((LOCATION, instance.pk))
+
+
+@receiver((pre_save, pre_delete), sender=User)
+def author_before_change(sender, instance, **kwargs):
+    instance._old_username = User.objects.filter(
+        pk=instance.pk
+    ).values_list('username', flat=True).first() or instance.username
+
+
+@receiver((post_save, post_delete), sender=User)
+def author_changed(sender, instance, **kwargs):
+    forget_lookups(
+        'user',
+        instance.username,
+        getattr(instance, '_old_username', instance.username),
+    )
+    bump_generations((AUTHOR, instance.pk), (AUTHOR_FEED, instance.pk))
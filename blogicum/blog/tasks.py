@@ -0,0 +1,33 @@
+from .cache import POST, bump_generations
+from .images import build_derivatives, strip_metadata
+from .models import Post
+
+
+def process_post_image(post_id, image_name):
+    """Фоновая обработка иллюстрации: EXIF, размеры, копии для srcset.
+
+    Пока задача не выполнена, шаблоны показывают оригинал. Если
+    иллюстрацию успели сменить, задача ничего не делает — новую
+    картинку обработает своя задача.
+
+    Очищенный от EXIF файл и копии подменяют оригинал одним UPDATE,
+    и только после него оригинал удаляется: упавшая на полпути задача
+    оставляет пост с рабочей картинкой, а повтор начинает заново.
+    """
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or post.image.name != image_name:
+        return
+    storage = post.image.storage
+    stripped = strip_metadata(post.image)
+    if stripped is not None:
+        post.image = stripped
+    thumbnail, variants = build_derivatives(post.image)
+    if Post.objects.filter(pk=post_id, image=image_name).update(
+        image=post.image.name, thumbnail=thumbnail, image_variants=variants
+    ):
+        if stripped is not None:
+            storage.delete(image_name)
+        bump_generations((POST, post_id))
+    elif stripped is not None:
+        # Иллюстрацию сменили, пока шла обработка.
+        storage.delete(stripped)
@@ -0,0 +1,71 @@
+from django import template
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blog.cache import get_or_render_post_card
+from blog.models import Post
+from blogicum.const import IMAGE_SIZES, PAGE_WINDOW_ENDS, PAGE_WINDOW_SIDE
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка публикации из кэша фрагментов.
+
+    Одна и та же карточка переиспользуется на главной, в категории
+    и в профиле: шаблон не зависит от текущего пользователя.
+    """
+    def render():
+        card = post
+        if post._state.db != DEFAULT_DB_ALIAS:
+            # Строка из реплики могла отстать от сдвинутого поколения,
+            # а карточка ляжет в общий кэш: рендерим её по основной базе.
+            card = Post.objects.for_cards().get(pk=post.pk)
+        return render_to_string('includes/post_card.html', {'post': card})
+
+    return mark_safe(get_or_render_post_card(post, render))
+
+
+@register.simple_tag
+def page_window(page_obj):
+    """Номера страниц вокруг текущей, с многоточиями на месте пропусков.
+
+    Ссылок всегда не больше 2 * (PAGE_WINDOW_SIDE + PAGE_WINDOW_ENDS) + 3,
+    сколько бы страниц ни было в ленте.
+    """
+    return page_obj.paginator.get_elided_page_range(
+        page_obj.number,
+        on_each_side=PAGE_WINDOW_SIDE,
+        on_ends=PAGE_WINDOW_ENDS,
+    )
+
+
+@register.inclusion_tag('includes/post_picture.html')
+def post_picture(post):
+    """Иллюстрация поста с srcset из уменьшенных копий.
+
+    Браузер сам выбирает ширину (и WebP, если умеет); ссылка по клику
+    по-прежнему ведёт на оригинал. У постов без копий — оригинал.
+    """
+    storage = post.image.storage
+    variants = post.image_variants or {}
+
+    def srcset(key):
+        return ', '.join(
+            f'{storage.url(name)} {width}w'
+            for width, name in variants.get(key, ())
+        )
+
+    jpeg = variants.get('jpeg')
+    return {
+        'post': post,
+        'original': post.image.url,
+        'src': storage.url(jpeg[-1][1]) if jpeg else post.image.url,
+        'webp_srcset': srcset('webp'),
+        'jpeg_srcset': srcset('jpeg'),
+        'sizes': IMAGE_SIZES,
+        'width': variants.get('width'),
+        'height': variants.get('height'),
+    }
@@ -0,0 +1,208 @@
+import os
+import tempfile
+from io import BytesIO
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             StopFutureHandlers)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from blogicum.const import IMAGE_UPLOAD_MAX_PIXELS, IMAGE_UPLOAD_MAX_SIZE
+
+# Каталог недокачанных иллюстраций в том же хранилище, что и сами
+# иллюстрации: сохранение готового файла — это переименование
+# в пределах одной файловой системы, без копирования.
+INCOMING_DIR = '.incoming'
+
+# Сколько первых байт файла держится в памяти, пока из них не удастся
+# прочитать заголовок с размерами картинки. JPEG с большими EXIF и
+# ICC-профилем укладывается в это с запасом.
+HEADER_LIMIT = 256 * 1024
+
+INVALID_IMAGE = forms.ImageField.default_error_messages['invalid_image']
+
+
+class IncomingUpload(UploadedFile):
+    """Иллюстрация, которая докачивается прямо в каталог хранилища.
+
+    Как и TemporaryUploadedFile, отдаёт temporary_file_path(), поэтому
+    FileSystemStorage не копирует файл, а переносит его на место.
+    Несохранённый файл удаляется при закрытии, в конце запроса.
+    """
+
+    def __init__(self, directory, name, content_type, charset,
+                 content_type_extra=None):
+        _, extension = os.path.splitext(name)
+        os.makedirs(directory, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(
+            suffix='.upload' + extension, dir=directory
+        )
+        super().__init__(
+            file, name, content_type, 0, charset, content_type_extra
+        )
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Файл уже перенесён хранилищем на постоянное место.
+            pass
+
+
+class RejectedUpload(UploadedFile):
+    """Отклонённая при загрузке иллюстрация: данных нет, только ошибка."""
+
+    def __init__(self, name, content_type, error):
+        super().__init__(BytesIO(), name, content_type, 0)
+        self.upload_error = error
+
+
+class PostImageUploadHandler(FileUploadHandler):
+    """Принимает иллюстрации постов потоком, проверяя их по ходу чтения.
+
+    Каждый кусок сразу пишется на диск, в памяти — только начало файла,
+    пока из него не прочитан заголовок. По заголовку, ещё до пикселей,
+    отсекаются картинки больше IMAGE_UPLOAD_MAX_PIXELS
+    («декомпрессионные бомбы»), по счётчику байт — файлы больше
+    IMAGE_UPLOAD_MAX_SIZE. Остаток отклонённого файла дочитывается
+    из запроса вхолостую, а форма получает RejectedUpload с причиной.
+
+    Остальные файлы и хранилища без локальных путей достаются
+    следующим обработчикам из FILE_UPLOAD_HANDLERS.
+    """
+
+    field_names = ('image',)
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 charset=None, content_type_extra=None):
+        super().new_file(
+            field_name, file_name, content_type, content_length,
+            charset, content_type_extra,
+        )
+        self.file = None
+        self.active = field_name in self.field_names
+        if not self.active:
+            return
+        try:
+            directory = self.get_storage().path(INCOMING_DIR)
+        except NotImplementedError:
+            self.active = False
+            return
+        self.error = None
+        self.head = b''
+        self.size = 0
+        if content_length is not None and (
+            content_length > IMAGE_UPLOAD_MAX_SIZE
+        ):
+            self.reject(self.size_error())
+        else:
+            self.file = IncomingUpload(
+                directory, file_name, content_type, charset,
+                content_type_extra,
+            )
+        raise StopFutureHandlers()
+
+    def get_storage(self):
+        from .models import Post
+
+        return Post._meta.get_field('image').storage
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.error is not None:
+            return None
+        self.size += len(raw_data)
+        if self.size > IMAGE_UPLOAD_MAX_SIZE:
+            self.reject(self.size_error())
+            return None
+        if self.head is not None:
+            self.head += raw_data
+            self.check_header()
+            if self.error is not None:
+                return None
+        self.file.write(raw_data)
+        return None
+
+    def check_header(self):
+        """Проверяет размеры картинки, как только они известны.
+
+        Image.open читает только заголовок и не выделяет память
+        под пиксели; пока данных для него мало, ждём следующий кусок.
+        """
+        try:
+            with Image.open(BytesIO(self.head)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject(self.pixels_error())
+            return
+        except (OSError, SyntaxError, ValueError):
+            if len(self.head) > HEADER_LIMIT:
+                self.reject(ValidationError(
+                    INVALID_IMAGE, code='invalid_image'
+                ))
+            return
+        self.head = None
+        if not width or not height:
+            self.reject(ValidationError(INVALID_IMAGE, code='invalid_image'))
+        elif width * height > IMAGE_UPLOAD_MAX_PIXELS:
+            self.reject(self.pixels_error(width, height))
+
+    def size_error(self):
+        return ValidationError(
+            'Файл иллюстрации не должен быть больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(IMAGE_UPLOAD_MAX_SIZE)},
+        )
+
+    def pixels_error(self, width=None, height=None):
+        size = f' {width}×{height}' if width else ''
+        return ValidationError(
+            'Изображение%(size)s больше %(limit)s мегапикселей.',
+            code='image_too_large',
+            params={
+                'size': size,
+                'limit': IMAGE_UPLOAD_MAX_PIXELS // 1_000_000,
+            },
+        )
+
+    def reject(self, error):
+        self.error = error
+        self.head = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if self.error is None and self.head is not None:
+            # Файл кончился раньше, чем нашёлся заголовок.
+            self.reject(ValidationError(INVALID_IMAGE, code='invalid_image'))
+        if self.error is not None:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.error
+            )
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def upload_interrupted(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class UploadImageField(forms.ImageField):
+    """ImageField, который показывает, почему файл отклонён при загрузке."""
+
+    def to_python(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error is not None:
+            raise error
+        return super().to_python(data)
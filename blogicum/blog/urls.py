@@ -24,6 +24,11 @@ posts_urls = [
          name='delete_post'
          ),
 
+    path('<int:post_id>/comments/',
+         views.CommentListView.as_view(),
+         name='comments'
+         ),
+
     path('<int:post_id>/comment/',
          views.CommentCreateView.as_view(),
          name='add_comment'
@@ -43,6 +48,7 @@ posts_urls = [
 urlpatterns = [
     path('', views.PostsHomepageView.as_view(), name='index'),
     path('posts/', include(posts_urls)),
+    path('search/', views.SearchView.as_view(), name='search'),
     path(
         'edit_profile/', views.ProfileUpdateView.as_view(), name='edit_profile'
     ),
@@ -1,47 +1,78 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
-from django.shortcuts import get_object_or_404
-from django.utils import timezone
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
-                                  UpdateView)
+                                  UpdateView, View)
 
-from blogicum.const import PUBL_COUNT
+from blogicum.const import COMMENTS_COUNT, PUBL_COUNT, SEARCH_COUNT
 
+from .cache import (AUTHOR, AUTHOR_FEED, CATEGORY, CATEGORY_FEED, LOCATION,
+                    POST, cached_lookup)
 from .forms import CommentForm
-from .mixins import (BaseQuerysetMixin, CommentBaseMixin, OnlyAuthorMixin,
-                     PostBaseMixin, UrlPostDetailMixin,
-                     UrlProfileMixin)
-from .models import Category, Post, User
-
-
-class PostsHomepageView(BaseQuerysetMixin, ListView):
+from .mixins import (BaseQuerysetMixin, CommentBaseMixin, ConditionalGetMixin,
+                     CursorPaginationMixin, FeedCacheMixin,
+                     MemoizedObjectMixin, OnlyAuthorMixin, PostBaseMixin,
+                     UrlPostDetailMixin, UrlProfileMixin, VisiblePostMixin)
+from .models import Category, FeedCounter, Post, User
+from .pagination import CommentPaginator, InvalidCursor, SearchPaginator
+from .search import match_expression
+
+# Поля пользователя, которые выводит страница профиля: их и кэшируем,
+# без пароля и прочего.
+PROFILE_FIELDS = (
+    'username',
+    'first_name',
+    'last_name',
+    'date_joined',
+    'is_staff',
+)
+
+
+class PostsHomepageView(
+    FeedCacheMixin,
+    CursorPaginationMixin,
+    BaseQuerysetMixin,
+    ListView
+):
     """Главная страница."""
 
     template_name = 'blog/index.html'
     paginate_by = PUBL_COUNT
 
 
-class UserProfileDetailView(BaseQuerysetMixin, ListView):
+class UserProfileDetailView(
+    MemoizedObjectMixin,
+    FeedCacheMixin,
+    CursorPaginationMixin,
+    BaseQuerysetMixin,
+    ListView
+):
     """Страница пользователя(Профиль)."""
 
     template_name = 'blog/profile.html'
     paginate_by = PUBL_COUNT
 
-    def get_object(self):
-        return get_object_or_404(User, username=self.kwargs['username'])
+    def load_object(self, queryset=None):
+        username = self.kwargs['username']
+        return cached_lookup(
+            'user',
+            username,
+            lambda: get_object_or_404(
+                User.objects.only(*PROFILE_FIELDS), username=username
+            ),
+        )
 
     def get_queryset(self):
         profile = self.get_object()
         if self.request.user == profile:
             return (
-                Post.objects.select_related(
-                    'author'
-                ).filter(
+                Post.objects.for_cards().filter(
                     author=profile,
                 ).order_by(
-                    '-pub_date'
-                ).annotate(
-                    comment_count=Count('comments')
+                    '-pub_date', '-pk'
                 ).all()
             )
         else:
@@ -51,6 +82,20 @@ class UserProfileDetailView(BaseQuerysetMixin, ListView):
                 author=profile
             )
 
+    def get_cache_scopes(self):
+        return ((AUTHOR_FEED, self.get_object().pk),)
+
+    def get_cache_variant(self):
+        # Автор видит в профиле и свои неопубликованные посты.
+        if self.request.user == self.get_object():
+            return 'owner'
+        return 'public'
+
+    def get_counter_key(self):
+        if self.request.user == self.get_object():
+            return (FeedCounter.AUTHOR_ALL, self.get_object().pk)
+        return (FeedCounter.AUTHOR, self.get_object().pk)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         profile = self.get_object()
@@ -74,34 +119,43 @@ class ProfileUpdateView(LoginRequiredMixin, UrlProfileMixin, UpdateView):
         return self.request.user
 
 
-class PostDetailView(PostBaseMixin, DetailView):
+class PostDetailView(
+    ConditionalGetMixin,
+    VisiblePostMixin,
+    PostBaseMixin,
+    DetailView
+):
     """Страница отдельной публикации."""
 
     template_name = 'blog/detail.html'
+    comments_paginate_by = COMMENTS_COUNT
 
     def get_object(self):
-        self.object = get_object_or_404(
-            Post, pk=self.kwargs['post_id']
-        )
-        if self.object.author != self.request.user:
-            return get_object_or_404(
-                Post.objects.filter(
-                    pub_date__lt=timezone.now(),
-                    is_published=True,
-                    category__is_published=True,
-                ),
-                pk=self.kwargs['post_id'],
-            )
-        return self.object
+        return self.get_post()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = (
-            self.object.comments.select_related('author')
-        )
+        context['comments'] = CommentPaginator(
+            self.object.comments.select_related('author'),
+            self.comments_paginate_by,
+        ).page()
         return context
 
+    def get_page_scopes(self, context):
+        post = self.object
+        return (
+            (POST, post.pk),
+            (AUTHOR, post.author_id),
+            (CATEGORY, post.category_id),
+            (LOCATION, post.location_id),
+            *((AUTHOR, comment.author_id) for comment in context['comments']),
+        )
+
+    def get_etag_parts(self, context):
+        comments = context['comments']
+        return (*(comment.pk for comment in comments), comments.next_cursor)
+
 
 class PostCreateView(
     LoginRequiredMixin,
@@ -159,7 +213,9 @@ class CommentCreateView(
         self.post = get_object_or_404(Post, pk=self.kwargs['post_id'])
         form.instance.author = self.request.user
         form.instance.post = self.post
-        return super().form_valid(form)
+        # Вместе со счётчиком, который увеличивает сигнал post_save.
+        with transaction.atomic():
+            return super().form_valid(form)
 
 
 class CommentUpdateView(
@@ -178,18 +234,70 @@ class CommentDeleteView(OnlyAuthorMixin, CommentBaseMixin, DeleteView):
     pass
 
 
-class CategoryDetailView(ListView):
+class CommentListView(VisiblePostMixin, View):
+    """Очередная порция комментариев к посту для «Показать ещё».
+
+    Отдаёт HTML-фрагмент, а с ?format=json — те же комментарии в JSON.
+    """
+
+    comments_paginate_by = COMMENTS_COUNT
+
+    def get(self, request, *args, **kwargs):
+        post = self.get_post()
+        try:
+            comments = CommentPaginator(
+                post.comments.select_related('author'),
+                self.comments_paginate_by,
+            ).page(request.GET.get('cursor'))
+        except InvalidCursor as error:
+            raise Http404(str(error))
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'comments': [
+                    {
+                        'id': comment.id,
+                        'author': comment.author.username,
+                        'text': comment.text,
+                        'created_at': comment.created_at.isoformat(),
+                    }
+                    for comment in comments
+                ],
+                'next_cursor': comments.next_cursor,
+            })
+        return render(
+            request,
+            'includes/comment_list.html',
+            {'post': post, 'comments': comments},
+        )
+
+
+class CategoryDetailView(
+    MemoizedObjectMixin,
+    FeedCacheMixin,
+    CursorPaginationMixin,
+    ListView
+):
     """Страница постов, принадлежащих одной категории."""
 
     template_name = 'blog/category.html'
     paginate_by = PUBL_COUNT
 
-    def get_object(self):
-        return get_object_or_404(
-            Category.objects.filter(is_published=True),
-            slug=self.kwargs['category_slug']
+    def load_object(self, queryset=None):
+        slug = self.kwargs['category_slug']
+        return cached_lookup(
+            'category',
+            slug,
+            lambda: get_object_or_404(
+                Category.objects.filter(is_published=True), slug=slug
+            ),
         )
 
+    def get_cache_scopes(self):
+        return ((CATEGORY_FEED, self.kwargs['category_slug']),)
+
+    def get_counter_key(self):
+        return (FeedCounter.CATEGORY, self.get_object().pk)
+
     def get_queryset(self):
         category = self.get_object()
         return BaseQuerysetMixin.get_queryset(self).filter(
@@ -200,3 +308,37 @@ class CategoryDetailView(ListView):
         context = super().get_context_data(**kwargs)
         context['category'] = self.get_object()
         return context
+
+
+class SearchView(BaseQuerysetMixin, ListView):
+    """Полнотекстовый поиск по публикациям.
+
+    Ищет по индексу FTS5 среди тех же публикаций, что видны в ленте,
+    и выдаёт их по убыванию релевантности с курсорной пагинацией.
+    """
+
+    template_name = 'blog/search.html'
+    paginate_by = SEARCH_COUNT
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        expression = match_expression(self.query)
+        results = super().get_queryset().annotate(
+            search_rank=F('search__rank')
+        )
+        if expression is None:
+            return results.none()
+        return results.filter(search__document__match=expression)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = SearchPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidPage as error:
+            raise Http404(str(error))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
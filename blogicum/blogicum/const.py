@@ -5,6 +5,92 @@ MAXLENGTH = 256
 # из названии поля отображается в админке.
 VISIBLE_LENGTH = 50
 
+# Сколько символов текста публикации выбирается для карточки в ленте.
+TEXT_PREVIEW_LENGTH = 300
+
 # Константа, определяющая число публикаций
 # на странице при пагинации
 PUBL_COUNT = 10
+
+# До скольких публикаций лента считается точным COUNT(*);
+# число публикаций в более длинных лентах берётся из счётчика ленты.
+FEED_EXACT_COUNT_LIMIT = 1000
+
+# Сколько номеров страниц выводит пагинатор по обе стороны от текущей
+# и у начала/конца ленты; остальные заменяются многоточием.
+PAGE_WINDOW_SIDE = 2
+PAGE_WINDOW_ENDS = 1
+
+# Сторона (в пикселях) миниатюры иллюстрации в списке публикаций админки.
+ADMIN_THUMBNAIL_SIZE = 100
+
+# Ширины (в пикселях) копий иллюстрации для srcset. Карточка и пост
+# выводятся не шире 40rem, поэтому больше 1280 не нужно даже на
+# экранах с двойной плотностью пикселей.
+IMAGE_WIDTHS = (320, 640, 960, 1280)
+
+# Ограничения на загружаемую иллюстрацию (blog.uploads): размер файла
+# в байтах и число пикселей, которое проверяется по заголовку картинки,
+# до её распаковки.
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+
+# Атрибут sizes для srcset: какой ширины картинка на странице.
+IMAGE_SIZES = '(max-width: 40rem) 100vw, 40rem'
+
+# Сколько результатов поиска выводится на странице.
+SEARCH_COUNT = 10
+
+# По сколько публикаций переиндексирует команда rebuild_search_index.
+SEARCH_REBUILD_BATCH_SIZE = 10000
+
+# Сколько комментариев показывается на странице поста
+# и подгружается по кнопке «Показать ещё».
+COMMENTS_COUNT = 20
+
+# Время жизни (в секундах) закэшированной карточки публикации.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время жизни (в секундах) закэшированных страниц лент и публикаций.
+# Записи устаревают раньше — при смене поколения своей области
+# или в момент выхода отложенной публикации.
+FEED_CACHE_TIMEOUT = 60 * 5
+POST_CACHE_TIMEOUT = 60 * 10
+
+# Пересчёт значений кэша одним запросом (blog.cache.get_or_set):
+# сколько секунд после срока запись ещё отдаётся, пока её пересчитывают;
+CACHE_STALE_TIMEOUT = 60
+# сколько секунд ждать чужого пересчёта, когда прежнего значения нет;
+CACHE_LOCK_WAIT = 2
+# насколько заранее (в долях времени пересчёта) запись может
+# пересчитаться до срока; 0 — только по сроку.
+CACHE_EARLY_RECOMPUTE_BETA = 1.0
+
+# Кэш целых страниц для анонимных читателей (blog.middleware):
+# сколько секунд копия страницы считается свежей;
+PAGE_CACHE_TIMEOUT = 60
+# сколько ещё секунд устаревшую копию можно отдавать, пока один
+# запрос рендерит новую;
+PAGE_CACHE_STALE_TIMEOUT = 60 * 10
+# сколько секунд запрос ждёт чужого рендеринга, когда копии ещё нет;
+PAGE_CACHE_LOCK_WAIT = 2
+# через сколько секунд право на рендеринг страницы освобождается само,
+# если рендеривший её процесс умер.
+PAGE_CACHE_RENDER_TIMEOUT = 30
+
+# Время жизни (в секундах) закэшированного числа строк в списках админки.
+ADMIN_COUNT_CACHE_TIMEOUT = 60
+
+# Время жизни (в секундах) кэша поиска категории по slug
+# и пользователя по username; при сохранении запись сбрасывается.
+LOOKUP_CACHE_TIMEOUT = 60
+
+# Фоновая очередь задач (core.jobs):
+# сколько раз пробовать задачу, прежде чем пометить её FAILED;
+JOB_MAX_ATTEMPTS = 3
+# через сколько секунд повторять упавшую задачу (растёт с попытками);
+JOB_RETRY_DELAY = 30
+# через сколько секунд задача, взятая умершим воркером, вернётся в очередь.
+JOB_LOCK_TIMEOUT = 60 * 10
+# Как часто (в секундах) воркер проверяет очередь, когда она пуста.
+JOB_POLL_INTERVAL = 1
@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,13 +25,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.TimingMiddleware',
+    'core.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'blogicum.urls'
@@ -57,6 +62,98 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переиспользуется между запросами потока,
+        # вместо открытия файла базы на каждый запрос.
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# Алиасы DATABASES с репликами основной базы только для чтения.
+# Для локальной проверки подойдёт копия db.sqlite3:
+# 'replica': {'ENGINE': 'django.db.backends.sqlite3',
+#             'NAME': BASE_DIR / 'replica.sqlite3'}.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Страницы, которые читают из реплик (core.middleware.ReplicaMiddleware).
+REPLICA_VIEWS = (
+    'blog:index',
+    'blog:category_posts',
+    'blog:profile',
+    'blog:post_detail',
+    'blog:search',
+    'pages:about',
+    'pages:rules',
+)
+
+# Сколько секунд после записи клиент читает только из основной базы,
+# чтобы не увидеть отстающую реплику.
+REPLICA_PIN_SECONDS = 10
+
+# Страницы, которые анонимные читатели получают из кэша целых страниц
+# (blog.middleware.PageCacheMiddleware).
+PAGE_CACHE_VIEWS = (
+    'blog:index',
+    'blog:category_posts',
+    'blog:post_detail',
+)
+
+# Межпроцессные блокировки пересчёта кэша (core.locks.FileLock):
+# каталог с файлами блокировок и число файлов, по которым
+# раскладываются ключи.
+LOCK_DIR = Path(tempfile.gettempdir()) / 'blogicum-locks'
+LOCK_STRIPES = 64
+
+# Доля запросов, у которых core.middleware.TimingMiddleware замеряет
+# SQL, view и шаблон (заголовок Server-Timing и лог core.middleware).
+REQUEST_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+
+# Поиск N+1 (core.middleware.NPlusOneMiddleware): доля проверяемых
+# запросов, сколько раз должен повториться запрос одной формы и что
+# делать с найденным — 'raise', 'warn' или 'log'.
+NPLUSONE_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_ACTION = 'warn' if DEBUG else 'log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Прагмы, которые выставляются каждому новому соединению с SQLite
+# (core.db.apply_sqlite_pragmas); None отключает прагму.
+SQLITE_PRAGMAS = {
+    # Читатели не ждут пишущего: комментарий не блокирует ленты.
+    'journal_mode': 'wal',
+    # В режиме WAL достаточно fsync на чекпоинте, а не на каждый коммит.
+    'synchronous': 'normal',
+    # Сколько миллисекунд ждать освободившейся блокировки записи.
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# Кэш лент и публикаций. Поколения, граница отложенных публикаций
+# и фрагменты должны быть общими для всех воркеров: в локальной памяти
+# сдвиг поколения в одном процессе не видели бы остальные, и карточки
+# устаревали бы до POST_CARD_CACHE_TIMEOUT. Тесты подменяют кэш
+# на LocMemCache (tests/conftest.py).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        # По умолчанию 300 записей: карточки, страницы и поколения
+        # небольшого блога превышают это сразу, и каждая запись
+        # стирала бы случайную треть кэша.
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
     }
 }
 
@@ -115,5 +212,13 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Префикс в маршруте для пользовательских файлов.
 MEDIA_URL = 'media/'
 
+# Иллюстрации постов принимаются потоком, с проверкой размеров по ходу
+# чтения; прочие файлы — стандартными обработчиками.
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploads.PostImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Редирект для нелогиненных пользователей.
 LOGIN_REDIRECT_URL = 'blog:index'
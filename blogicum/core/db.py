@@ -0,0 +1,16 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Выставляет новому соединению с SQLite прагмы из SQLITE_PRAGMAS.
+
+    journal_mode=wal сохраняется в самом файле базы, остальные прагмы
+    действуют только на соединение — поэтому их и выставляем здесь.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if value is not None:
+                cursor.execute(f'PRAGMA {name} = {value}')
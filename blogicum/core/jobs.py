@@ -0,0 +1,74 @@
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from blogicum.const import JOB_LOCK_TIMEOUT, JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY
+
+from .models import Job
+
+# Обработчики по типу задачи: 'blog.post_image' -> 'blog.tasks.process'.
+# Храним пути, а не функции: дочерний процесс воркера импортирует
+# обработчик сам.
+HANDLERS = {}
+
+
+def register(kind, handler_path):
+    HANDLERS[kind] = handler_path
+
+
+def enqueue(kind, **payload):
+    """Ставит задачу в очередь; выполнит её воркер run_worker."""
+    if kind not in HANDLERS:
+        raise KeyError(f'Неизвестный тип задачи: {kind}')
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def claim(limit):
+    """Забирает до limit готовых к запуску задач и помечает их RUNNING.
+
+    Зависшие задачи (воркер умер посреди работы) возвращаются в работу
+    через JOB_LOCK_TIMEOUT. UPDATE с проверкой статуса не даёт двум
+    воркерам взять одну задачу.
+    """
+    now = timezone.now()
+    Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=JOB_LOCK_TIMEOUT),
+    ).update(status=Job.PENDING)
+    with transaction.atomic():
+        ids = list(
+            Job.objects.filter(
+                status=Job.PENDING, run_after__lte=now
+            ).order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=ids, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_at=now
+        )
+    return list(Job.objects.filter(
+        id__in=ids, status=Job.RUNNING, locked_at=now
+    ))
+
+
+def finish(job, error=None):
+    """Записывает результат: DONE, повтор позже или FAILED."""
+    job.attempts += 1
+    job.locked_at = None
+    if error is None:
+        job.status = Job.DONE
+        job.error = ''
+    else:
+        job.error = ''.join(traceback.format_exception(
+            type(error), error, error.__traceback__
+        ))
+        if job.attempts < JOB_MAX_ATTEMPTS:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=JOB_RETRY_DELAY * job.attempts
+            )
+        else:
+            job.status = Job.FAILED
+    job.save(update_fields=(
+        'attempts', 'locked_at', 'status', 'error', 'run_after'
+    ))
@@ -0,0 +1,87 @@
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
+
+# Как часто (в секундах) ожидающий проверяет, не освободилась ли
+# блокировка.
+POLL_INTERVAL = 0.02
+
+# Файлы блокировок, которые держит текущий поток.
+_held = threading.local()
+
+
+class FileLock:
+    """Межпроцессная блокировка на flock(2) по имени.
+
+    Имена раскладываются по LOCK_STRIPES файлам в LOCK_DIR: файлов
+    не становится больше, сколько бы ключей ни блокировалось, а редкие
+    совпадения только заставляют подождать чужой пересчёт. flock
+    привязан к открытому файлу, поэтому исключает друг друга и потоки
+    одного процесса, а умерший процесс снимает блокировку сам.
+
+    Повторно взять файл, который поток уже держит (вложенный пересчёт
+    попал в ту же полосу), можно сразу: иначе поток ждал бы сам себя.
+    """
+
+    def __init__(self, name):
+        digest = hashlib.md5(name.encode()).digest()
+        stripe = int.from_bytes(digest[:4], 'big') % settings.LOCK_STRIPES
+        self.path = os.path.join(settings.LOCK_DIR, f'{stripe}.lock')
+        self.fd = None
+        self.nested = False
+
+    @staticmethod
+    def held():
+        if not hasattr(_held, 'paths'):
+            _held.paths = set()
+        return _held.paths
+
+    def acquire(self, blocking=True, timeout=None):
+        """Берёт блокировку; без blocking или по истечении timeout
+        секунд возвращает False, если она занята.
+        """
+        held = self.held()
+        if self.path in held:
+            self.nested = True
+            return True
+        os.makedirs(settings.LOCK_DIR, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    if not blocking or (
+                        deadline is not None and time.monotonic() >= deadline
+                    ):
+                        os.close(fd)
+                        return False
+                    time.sleep(POLL_INTERVAL)
+                else:
+                    self.fd = fd
+                    held.add(self.path)
+                    return True
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def release(self):
+        if self.nested:
+            self.nested = False
+        elif self.fd is not None:
+            self.held().discard(self.path)
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
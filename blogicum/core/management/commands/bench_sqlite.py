@@ -0,0 +1,138 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT,'
+    ' pub_date REAL, comment_count INTEGER DEFAULT 0)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER,'
+    ' text TEXT, created_at REAL)',
+)
+FEED_SQL = 'SELECT id, title, comment_count FROM post'\
+    ' ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?'
+
+
+class Command(BaseCommand):
+    """Сравнивает пропускную способность SQLite с прагмами и без.
+
+    Во временной базе с лентой публикаций одновременно работают
+    читатели (запрос страницы ленты) и писатели (комментарий плюс
+    обновление счётчика в одной транзакции, как в CommentCreateView).
+    Первый прогон — с настройками SQLite по умолчанию, второй —
+    с прагмами из SQLITE_PRAGMAS.
+    """
+
+    help = 'Замеряет чтения и записи SQLite до и после SQLITE_PRAGMAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--seconds', type=float, default=3,
+            help='Длительность каждого прогона.',
+        )
+        parser.add_argument('--posts', type=int, default=10000)
+
+    def handle(self, *args, readers, writers, seconds, posts, **options):
+        for label, pragmas in (
+            ('по умолчанию', {}),
+            ('SQLITE_PRAGMAS', getattr(settings, 'SQLITE_PRAGMAS', {})),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / 'bench.sqlite3'
+                self.create_database(path, posts)
+                reads, writes, locked = self.run(
+                    path, pragmas, readers, writers, seconds
+                )
+            self.stdout.write(
+                f'{label}: чтений/с {reads / seconds:.0f}, '
+                f'записей/с {writes / seconds:.0f}, '
+                f'ошибок блокировки {locked}'
+            )
+
+    def create_database(self, path, posts):
+        connection = sqlite3.connect(path)
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.executemany(
+                'INSERT INTO post (title, pub_date) VALUES (?, ?)',
+                ((f'Публикация {i}', i) for i in range(posts)),
+            )
+        connection.close()
+
+    def connect(self, path, pragmas):
+        # Как и Django, держим соединение на поток всё время прогона.
+        connection = sqlite3.connect(path, isolation_level=None)
+        for name, value in pragmas.items():
+            if value is not None:
+                connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def run(self, path, pragmas, readers, writers, seconds):
+        # journal_mode сохраняется в файле, его выставляем до старта.
+        self.connect(path, pragmas).close()
+        self.counters = {'reads': 0, 'writes': 0, 'locked': 0}
+        self.lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+        threads = [
+            threading.Thread(target=target, args=(path, pragmas, deadline))
+            for target, number in ((self.read, readers),
+                                   (self.write, writers))
+            for _ in range(number)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return (self.counters['reads'], self.counters['writes'],
+                self.counters['locked'])
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def read(self, path, pragmas, deadline):
+        connection = self.connect(path, pragmas)
+        offset = 0
+        while time.monotonic() < deadline:
+            try:
+                connection.execute(FEED_SQL, (offset,)).fetchall()
+            except sqlite3.OperationalError:
+                self.count('locked')
+                continue
+            offset = (offset + 10) % 1000
+            self.count('reads')
+        connection.close()
+
+    def write(self, path, pragmas, deadline):
+        connection = self.connect(path, pragmas)
+        post_id = 1
+        while time.monotonic() < deadline:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT INTO comment (post_id, text, created_at)'
+                    ' VALUES (?, ?, ?)',
+                    (post_id, 'Комментарий', time.time()),
+                )
+                connection.execute(
+                    'UPDATE post SET comment_count = comment_count + 1'
+                    ' WHERE id = ?',
+                    (post_id,),
+                )
+                connection.execute('COMMIT')
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                self.count('locked')
+                continue
+            post_id = post_id % 1000 + 1
+            self.count('writes')
+        connection.close()
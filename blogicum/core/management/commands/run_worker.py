@@ -0,0 +1,91 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blogicum.const import JOB_POLL_INTERVAL
+from core import jobs, worker
+
+
+class Command(BaseCommand):
+    """Воркер фоновой очереди core.jobs.
+
+    Главный процесс забирает задачи из базы и записывает результаты,
+    а сами обработчики (пересжатие картинок и т.п.) выполняются в пуле
+    процессов, не занимая ни веб-процессы, ни GIL воркера.
+    С --processes 0 задачи выполняются прямо в процессе воркера.
+    """
+
+    help = 'Выполняет задачи фоновой очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Размер пула процессов; 0 — без пула.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить всё, что есть в очереди, и завершиться.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=JOB_POLL_INTERVAL,
+            help='Пауза (в секундах) между проверками пустой очереди.',
+        )
+
+    def handle(self, *args, processes, once, poll_interval, **options):
+        pool = None
+        if processes:
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=worker.init_worker_process,
+            )
+        done = failed = 0
+        try:
+            while True:
+                batch = jobs.claim(max(processes, 1) * 2)
+                if not batch:
+                    if once:
+                        break
+                    # Не держим соединение открытым, пока ждём задач.
+                    connections.close_all()
+                    time.sleep(poll_interval)
+                    continue
+                for job, error in self.run_batch(pool, batch):
+                    jobs.finish(job, error)
+                    if error is None:
+                        done += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f'{job}: {error!r}')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
+
+    def run_batch(self, pool, batch):
+        """Выполняет задачи, возвращает пары (задача, ошибка или None)."""
+        calls = [(jobs.HANDLERS[job.kind], job.payload) for job in batch]
+        if pool is None:
+            results = []
+            for job, call in zip(batch, calls):
+                try:
+                    worker.execute(*call)
+                except Exception as error:
+                    results.append((job, error))
+                else:
+                    results.append((job, None))
+            return results
+        futures = [pool.submit(worker.execute, *call) for call in calls]
+        return [(job, future.exception()) for job, future in zip(
+            batch, futures
+        )]
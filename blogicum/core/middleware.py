@@ -0,0 +1,191 @@
+import json
+import logging
+import random
+import time
+import warnings
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import routers
+from .nplusone import NPlusOneError, NPlusOneWarning, detect_n_plus_one
+
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения страниц из REPLICA_VIEWS на реплики.
+
+    Реплика может отставать от основной базы, поэтому после любой
+    записи ответ ставит cookie: пока она жива (REPLICA_PIN_SECONDS),
+    все запросы этого клиента читают из основной базы — автор сразу
+    видит свой пост или комментарий. Общий кэш (blog.cache и кэш
+    страниц) пересчитывается по основной базе, так что отставание
+    реплики видно только в собственном ответе, а не под новыми
+    поколениями кэша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset_state()
+        try:
+            response = self.get_response(request)
+            wrote = routers.wrote_to_primary()
+        finally:
+            routers.reset_state()
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.use_replicas(
+            request.method in ('GET', 'HEAD')
+            and REPLICA_PIN_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+        )
+
+
+class RequestTiming:
+    """Замеры одного запроса: SQL, view, рендеринг шаблона, всего."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view_started = None
+        self.view = None
+        self.render_started = None
+        self.render = None
+        self.total = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def view_returned(self):
+        if self.view_started is not None and self.view is None:
+            self.view = time.perf_counter() - self.view_started
+
+    def rendered(self, response):
+        self.render = time.perf_counter() - self.render_started
+
+    def finish(self):
+        self.view_returned()
+        self.total = time.perf_counter() - self.started
+
+    def metrics(self):
+        """(имя, миллисекунды, описание) для Server-Timing и лога.
+
+        Описания латиницей: заголовки HTTP передаются в latin-1.
+        """
+        metrics = [('db', self.db, f'{self.queries} queries')]
+        if self.view is not None:
+            metrics.append(('view', self.view, 'view'))
+        if self.render is not None:
+            metrics.append(('tpl', self.render, 'template'))
+        metrics.append(('total', self.total, 'total'))
+        return [(name, round(dur * 1000, 1), desc)
+                for name, dur, desc in metrics]
+
+
+class TimingMiddleware:
+    """Замеряет SQL, view и рендеринг шаблона у части запросов.
+
+    Доля запросов задаётся REQUEST_TIMING_SAMPLE_RATE: у остальных
+    middleware ничего не делает. Запросы ко всем базам считаются через
+    connection.execute_wrapper. Замеры уходят клиенту в заголовке
+    Server-Timing (их показывают инструменты разработчика в браузере)
+    и в лог core.middleware одной JSON-строкой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timing.record_query)
+                )
+            response = self.get_response(request)
+        timing.finish()
+        metrics = timing.metrics()
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={dur};desc="{desc}"' for name, dur, desc in metrics
+        )
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': timing.queries,
+            **{f'{name}_ms': dur for name, dur, _ in metrics},
+        }
+        logger.info(
+            json.dumps(record, ensure_ascii=False), extra={'timing': record}
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Вызывается последним перед рендерингом: view уже вернул ответ.
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.view_returned()
+            timing.render_started = time.perf_counter()
+            response.add_post_render_callback(timing.rendered)
+        return response
+
+
+class NPlusOneMiddleware:
+    """Ищет N+1 в части запросов (NPLUSONE_SAMPLE_RATE).
+
+    Что делать с найденным, задаёт NPLUSONE_ACTION: 'raise' — исключение
+    NPlusOneError после ответа view, 'warn' — NPlusOneWarning,
+    'log' — предупреждение в лог core.middleware. В сообщении — view,
+    форма повторяющегося запроса и строка шаблона или кода, откуда он
+    выполняется.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.NPLUSONE_SAMPLE_RATE:
+            return self.get_response(request)
+        with detect_n_plus_one() as detector:
+            response = self.get_response(request)
+        if detector.findings:
+            match = request.resolver_match
+            view = match.view_name if match else None
+            message = detector.report(f' во view {view} ({request.path})')
+            if settings.NPLUSONE_ACTION == 'raise':
+                raise NPlusOneError(message)
+            if settings.NPLUSONE_ACTION == 'warn':
+                warnings.warn(message, NPlusOneWarning)
+            else:
+                logger.warning(message)
+        return response
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class PublishedModel(models.Model):
@@ -18,3 +19,48 @@ class PublishedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(models.Model):
+    """Задача фоновой очереди (core.jobs), выполняемая run_worker.
+
+    Очередь живёт в той же базе, поэтому не нужен отдельный брокер:
+    задача ставится в одной транзакции с данными, которые её породили.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Тип', max_length=64)
+    payload = models.JSONField('Параметры', default=dict)
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True)
+    error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Добавлена', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            # Выборка очередных задач воркером.
+            models.Index(
+                fields=('run_after', 'id'),
+                name='job_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
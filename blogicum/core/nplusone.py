@@ -0,0 +1,91 @@
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+# Списки параметров IN (%s, %s, ...) разной длины — один и тот же запрос.
+PARAMS_LIST = re.compile(r'%s(?:, %s)+')
+
+
+class NPlusOneWarning(UserWarning):
+    """Запрос одной формы повторился в запросе страницы много раз."""
+
+
+class NPlusOneError(Exception):
+    """То же, что NPlusOneWarning, при NPLUSONE_ACTION = 'raise'."""
+
+
+def fingerprint(sql):
+    """Форма запроса: SQL без значений параметров."""
+    return PARAMS_LIST.sub('%s...', sql)
+
+
+def query_origin():
+    """Откуда выполнен запрос: строка шаблона, если его рендерят,
+    иначе ближайший кадр кода проекта.
+    """
+    frame = sys._getframe(1)
+    code_origin = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if isinstance(node, Node) and getattr(node, 'token', None):
+            origin = getattr(node, 'origin', None)
+            name = origin.template_name if origin else '<string>'
+            return f'{name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if code_origin is None and filename.startswith(
+            str(settings.BASE_DIR)
+        ) and 'site-packages' not in filename and filename != __file__:
+            code_origin = f'{filename}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code_origin or '<unknown>'
+
+
+class NPlusOneDetector:
+    """Считает запросы по форме и запоминает, откуда пришли повторы.
+
+    Запрос одной формы, выполненный NPLUSONE_THRESHOLD раз и больше, —
+    признак N+1: связанный объект подгружается по одному на каждую
+    строку вместо select_related/prefetch_related.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            shape = fingerprint(sql)
+            self.counts[shape] += 1
+            if self.counts[shape] == self.threshold:
+                self.origins[shape] = query_origin()
+        return execute(sql, params, many, context)
+
+    @property
+    def findings(self):
+        """[(форма запроса, сколько раз, откуда), ...]."""
+        return [
+            (shape, self.counts[shape], origin)
+            for shape, origin in self.origins.items()
+        ]
+
+    def report(self, where=''):
+        lines = [f'N+1 запросов{where}:']
+        for shape, count, origin in self.findings:
+            lines.append(f'  {count} раз из {origin}: {shape}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None):
+    """Собирает повторы запросов во всех базах внутри блока with."""
+    detector = NPlusOneDetector(threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
@@ -0,0 +1,61 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def use_replicas(enabled=True):
+    """Направляет чтения текущего потока на реплики (или обратно)."""
+    _state.replicas = enabled
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в основную базу.
+
+    Для пересчёта общих записей кэша: они ложатся под уже сдвинутые
+    поколения, и данные из отстающей реплики жили бы там до истечения
+    записи, а не REPLICA_PIN_SECONDS.
+    """
+    enabled = getattr(_state, 'replicas', False)
+    _state.replicas = False
+    try:
+        yield
+    finally:
+        _state.replicas = enabled
+
+
+def reset_state():
+    _state.replicas = False
+    _state.wrote = False
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    """Чтения — на реплики из DATABASE_REPLICAS, записи — на default.
+
+    Реплики используются, только если их включил ReplicaMiddleware
+    для текущего запроса; всё остальное, включая команды, сигналы
+    и пересчёт общего кэша (primary_reads), по-прежнему читает
+    из основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and getattr(_state, 'replicas', False):
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
@@ -0,0 +1,19 @@
+"""Код, который выполняется в процессах пула run_worker.
+
+Модуль не импортирует модели на верхнем уровне: процессы пула
+запускаются через spawn и импортируют его до django.setup().
+"""
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+
+def init_worker_process():
+    import django
+
+    django.setup()
+
+
+def execute(handler_path, payload):
+    """Выполняет обработчик задачи по его пути импорта."""
+    close_old_connections()
+    import_string(handler_path)(**payload)
@@ -26,12 +26,59 @@ UrlRepr = NamedTuple("UrlRepr", [("url", str), ("repr", str)])
 TitledUrlRepr = TypeVar("TitledUrlRepr", bound=Tuple[UrlRepr, str])
 
 
+def pytest_configure(config):
+    # Кэш в памяти процесса: тесты не пишут в каталог кэша проекта.
+    # Подменяется до сбора тестов — модули импортируют cache сразу.
+    override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogicum-tests',
+    }}).enable()
+
+
 @pytest.fixture(autouse=True)
 def enable_debug_false():
     with override_settings(DEBUG=False):
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+
+
+@pytest.fixture
+def locked_elsewhere():
+    """Держит блокировку core.locks.FileLock из другого потока,
+    как чужой запрос, пока открыт контекст.
+    """
+    import threading
+    from contextlib import contextmanager
+
+    from core.locks import FileLock
+
+    @contextmanager
+    def hold(name):
+        locked, done = threading.Event(), threading.Event()
+
+        def run():
+            with FileLock(name):
+                locked.set()
+                done.wait()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        locked.wait()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+    return hold
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -83,6 +130,7 @@ pytest_plugins = [
     "fixtures.locations",
     "fixtures.categories",
     "fixtures.comments",
+    "fixtures.queries",
     "adapters.comment",
 ]
 
@@ -354,6 +402,7 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+import pytest
+
+from core.nplusone import detect_n_plus_one
+
+
+@pytest.fixture
+def assert_no_n_plus_one():
+    """Контекстный менеджер: тест падает, если внутри блока with
+    запрос одной формы повторился NPLUSONE_THRESHOLD раз и больше.
+    """
+    @contextmanager
+    def check(threshold=None):
+        with detect_n_plus_one(threshold) as detector:
+            yield detector
+        assert not detector.findings, detector.report()
+    return check
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Comment, Post
+from blogicum.const import ADMIN_THUMBNAIL_SIZE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def changelist_ids(admin_client, model, query):
+    response = admin_client.get(f'/admin/blog/{model}/', {'q': query})
+    assert response.status_code == 200
+    return {obj.id for obj in response.context['cl'].result_list}
+
+
+def test_admin_search_uses_prefixes_and_fts(
+        admin_client, mixer, django_user_model, another_category
+):
+    author = mixer.blend(django_user_model, username='lakeside')
+    by_author = mixer.blend('blog.Post', author=author, title='Пусто')
+    in_category = mixer.blend(
+        'blog.Post', category=another_category, title='Пусто'
+    )
+    by_title = mixer.blend(
+        'blog.Post', title='Байкал зимой',
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    comment = mixer.blend('blog.Comment', author=author, post=by_title)
+
+    assert changelist_ids(admin_client, 'post', 'lake') == {by_author.id}, (
+        "Убедитесь, что публикации в админке ищутся по началу"
+        " имени автора."
+    )
+    slug_prefix = another_category.slug[:4]
+    assert in_category.id in changelist_ids(
+        admin_client, 'post', slug_prefix
+    )
+    assert changelist_ids(admin_client, 'post', 'байкал') == {by_title.id}, (
+        "Убедитесь, что публикации в админке ищутся по индексу FTS5."
+    )
+    assert changelist_ids(admin_client, 'comment', 'lake') == {comment.id}
+    assert changelist_ids(admin_client, 'comment', 'байкал') == {comment.id}
+
+
+def test_admin_changelist_count_is_cached(admin_client, mixer):
+    mixer.cycle(3).blend('blog.Post')
+    admin_client.get('/admin/blog/post/')
+    with CaptureQueriesContext(connection) as ctx:
+        admin_client.get('/admin/blog/post/')
+    counts = [
+        q['sql'] for q in ctx.captured_queries
+        if 'COUNT(' in q['sql'] and 'blog_post' in q['sql']
+    ]
+    assert counts == [], (
+        "Убедитесь, что число строк в списке админки берётся из кэша."
+    )
+
+
+def changelist_queries(admin_client, model):
+    admin_client.get(f'/admin/blog/{model}/')
+    with CaptureQueriesContext(connection) as ctx:
+        response = admin_client.get(f'/admin/blog/{model}/')
+    return len(ctx.captured_queries), len(response.context['cl'].result_list)
+
+
+@pytest.mark.parametrize('model', ('post', 'comment'))
+def test_admin_changelist_queries_do_not_grow_with_rows(
+        admin_client, mixer, model
+):
+    mixer.blend('blog.Comment', post=mixer.blend('blog.Post'))
+    one_row, rows = changelist_queries(admin_client, model)
+    assert rows == 1
+
+    posts = mixer.cycle(99).blend(
+        'blog.Post',
+        author=mixer.SELECT,
+        category=mixer.blend('blog.Category'),
+    )
+    mixer.cycle(99).blend('blog.Comment', post=mixer.sequence(*posts))
+    hundred_rows, rows = changelist_queries(admin_client, model)
+    assert rows == 100
+    assert hundred_rows == one_row, (
+        f"Убедитесь, что список `{model}` в админке не делает отдельных"
+        " запросов на каждую строку."
+    )
+
+
+def test_comment_str_does_not_query_post(mixer):
+    comment = Comment.objects.get(pk=mixer.blend('blog.Comment').pk)
+    with CaptureQueriesContext(connection) as ctx:
+        str(comment)
+    assert ctx.captured_queries == []
+    comment = Comment.objects.select_related('post').get(pk=comment.pk)
+    assert comment.post.title[:10] in str(comment)
+
+
+def test_admin_shows_pregenerated_thumbnail(
+        admin_client, mixer, settings, tmp_path
+):
+    settings.MEDIA_ROOT = tmp_path
+    buffer = BytesIO()
+    Image.new('RGB', (1200, 800), 'red').save(buffer, 'PNG')
+    post = mixer.blend('blog.Post', image=SimpleUploadedFile(
+        'photo.png', buffer.getvalue(), content_type='image/png'
+    ))
+    call_command('run_worker', '--once', '--processes', '0',
+                 stdout=StringIO())
+    post = Post.objects.get(pk=post.pk)
+    assert post.thumbnail, (
+        "Убедитесь, что для иллюстрации поста создаётся миниатюра."
+    )
+    with Image.open(tmp_path / post.thumbnail) as thumbnail:
+        assert max(thumbnail.size) == ADMIN_THUMBNAIL_SIZE
+
+    content = admin_client.get('/admin/blog/post/').content.decode('utf-8')
+    assert post.thumbnail_url in content
+    assert f'src="{post.image.url}"' not in content
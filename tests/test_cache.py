@@ -0,0 +1,279 @@
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import transaction
+from django.template import Context, Template
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.cache import (AUTHOR_FEED, CATEGORY_FEED, FEED, POST,
+                        bump_generations, get_generations, get_or_set)
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def render_card(post):
+    post = Post.objects.for_cards().get(pk=post.pk)
+    return Template('{% load blog_tags %}{% post_card post %}').render(
+        Context({'post': post})
+    )
+
+
+def test_post_card_fragment_is_invalidated(post_with_published_location):
+    post = post_with_published_location
+    first = render_card(post)
+    assert post.title in first
+
+    Post.objects.filter(pk=post.pk).update(title='Без сигнала')
+    assert render_card(post) == first, (
+        "Убедитесь, что карточка публикации берётся из кэша."
+    )
+
+    for related, attr, value in (
+        (post, 'title', 'Новый заголовок'),
+        (post.category, 'title', 'Новая категория'),
+        (post.location, 'name', 'Новое место'),
+        (post.author, 'username', 'new_username'),
+    ):
+        setattr(related, attr, value)
+        related.save()
+        assert value in render_card(post), (
+            "Убедитесь, что карточка публикации инвалидируется при"
+            f" сохранении `{type(related).__name__}`."
+        )
+
+    Post.objects.filter(pk=post.pk).update(comment_count=7)
+    assert 'Комментарии (7)' in render_card(post), (
+        "Убедитесь, что карточка публикации обновляется при изменении"
+        " числа комментариев."
+    )
+
+
+def feed_ids(client, url):
+    return [post.id for post in client.get(url).context['page_obj']]
+
+
+@pytest.fixture
+def without_page_cache(settings):
+    # Проверяется кэш лент под целыми страницами: из кэша страниц
+    # ответ приходит без контекста шаблона.
+    settings.PAGE_CACHE_VIEWS = ()
+
+
+def test_feed_pages_become_stale_by_generation(
+        client, mixer, many_posts_with_published_locations,
+        without_page_cache,
+):
+    posts = many_posts_with_published_locations
+    category = posts[0].category
+    urls = ('/', f'/category/{category.slug}/',
+            f'/profile/{posts[0].author.username}/')
+    cached = {url: feed_ids(client, url) for url in urls}
+
+    # Обновление без сигналов: свежий запрос отсортировал бы ленту иначе.
+    Post.objects.update(pub_date=timezone.now() - timedelta(days=1))
+    for url in urls:
+        assert feed_ids(client, url) == cached[url], (
+            f"Убедитесь, что страница {url} берётся из кэша."
+        )
+
+    fresh = mixer.blend(
+        'blog.Post', author=posts[0].author, category=category,
+        pub_date=timezone.now() - timedelta(minutes=1),
+    )
+    for url in urls:
+        assert feed_ids(client, url)[0] == fresh.id, (
+            f"Убедитесь, что новая публикация инвалидирует страницу {url}."
+        )
+
+
+def test_writes_bump_only_affected_generations(
+        mixer, post_with_published_location, another_category
+):
+    post = post_with_published_location
+    scopes = (
+        (FEED, None),
+        (CATEGORY_FEED, post.category.slug),
+        (CATEGORY_FEED, another_category.slug),
+        (AUTHOR_FEED, post.author_id),
+        (POST, post.pk),
+    )
+    before = get_generations(*scopes)
+
+    post.location.save()
+    assert get_generations(*scopes) == before
+
+    post.text = 'Другой текст'
+    post.save()
+    after = get_generations(*scopes)
+    changed = [b != a for b, a in zip(before, after)]
+    assert changed == [True, True, False, True, True]
+
+    mixer.blend('blog.Comment', post=post)
+    assert get_generations(*scopes)[2] == after[2]
+
+
+def test_detail_page_cache_follows_category(
+        client, post_with_published_location
+):
+    post = post_with_published_location
+    assert client.get(f'/posts/{post.id}/').status_code == HTTPStatus.OK
+    post.category.is_published = False
+    post.category.save()
+    assert client.get(f'/posts/{post.id}/').status_code == (
+        HTTPStatus.NOT_FOUND
+    ), (
+        "Убедитесь, что снятие категории с публикации инвалидирует"
+        " закэшированную страницу поста."
+    )
+
+
+def test_generations_with_file_based_cache(tmp_path):
+    backend = 'django.core.cache.backends.filebased.FileBasedCache'
+    with override_settings(CACHES={'default': {
+        'BACKEND': backend, 'LOCATION': str(tmp_path), 'TIMEOUT': 1,
+    }}):
+        first, = get_generations((FEED, None))
+        assert get_generations((FEED, None)) == [first]
+        bump_generations((FEED, None))
+        assert get_generations((FEED, None)) == [first + 1]
+        bump_generations((POST, 1))
+        assert get_generations((FEED, None)) == [first + 1]
+        time.sleep(1.1)
+        assert get_generations((FEED, None)) == [first + 1], (
+            "Убедитесь, что сдвинутое поколение хранится без срока,"
+            " а не с таймаутом кэша по умолчанию."
+        )
+
+
+def test_comment_bumps_post_generation_again_on_commit(
+        django_capture_on_commit_callbacks, mixer,
+        post_with_published_location,
+):
+    post = post_with_published_location
+    scopes = ((POST, post.pk), (FEED, None))
+    before = get_generations(*scopes)
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            mixer.blend('blog.Comment', post=post)
+            assert get_generations(*scopes) == [before[0] + 1, before[1]]
+    assert get_generations(*scopes) == [before[0] + 2, before[1]], (
+        "Убедитесь, что комментарий сдвигает только поколение поста,"
+        " и ещё раз — после коммита транзакции."
+    )
+
+
+def test_scheduled_post_goes_live_at_boundary(
+        client, mixer, monkeypatch, post_with_published_location,
+        without_page_cache,
+):
+    from blog import schedule
+
+    post = post_with_published_location
+    url = f'/category/{post.category.slug}/'
+    assert feed_ids(client, url) == [post.id]
+    assert schedule.visible_before() is None
+
+    go_live = timezone.now() + timedelta(hours=1)
+    scheduled = mixer.blend(
+        'blog.Post', author=post.author, category=post.category,
+        pub_date=go_live,
+    )
+    assert schedule.visible_before() == go_live, (
+        "Убедитесь, что граница видимости сдвигается к ближайшей"
+        " отложенной публикации."
+    )
+    assert feed_ids(client, url) == [post.id]
+
+    monkeypatch.setattr(
+        schedule.timezone, 'now', lambda: go_live + timedelta(seconds=1)
+    )
+    assert feed_ids(client, url) == [scheduled.id, post.id], (
+        "Убедитесь, что лента инвалидируется, когда отложенная публикация"
+        " становится видимой."
+    )
+    assert schedule.visible_before() is None
+
+
+def test_post_scheduled_without_signal_stays_hidden(
+        client, mixer, post_with_published_location, without_page_cache,
+):
+    from blog import schedule
+
+    post = post_with_published_location
+    assert schedule.visible_before() is None
+    Post.objects.bulk_create([Post(
+        title='Отложенный пост', text='Текст', author=post.author,
+        category=post.category, location=post.location,
+        pub_date=timezone.now() + timedelta(days=3),
+    )])
+    bump_generations((FEED, None))
+    assert feed_ids(client, '/') == [post.id], (
+        "Убедитесь, что отложенный пост не попадает в ленту раньше срока,"
+        " даже если граница видимости о нём не знает."
+    )
+
+
+def slow_compute(log_path, results):
+    def compute():
+        with open(log_path, 'a') as log:
+            log.write(f'{os.getpid()}\n')
+        time.sleep(0.3)
+        return 'значение'
+    results.put(get_or_set('blog:test:single_flight', compute, 60))
+
+
+def test_get_or_set_computes_once_across_processes(settings, tmp_path):
+    backend = 'django.core.cache.backends.filebased.FileBasedCache'
+    settings.LOCK_DIR = tmp_path / 'locks'
+    log_path = tmp_path / 'computed.log'
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    with override_settings(CACHES={
+        'default': {'BACKEND': backend, 'LOCATION': str(tmp_path / 'cache')}
+    }):
+        workers = [
+            context.Process(target=slow_compute, args=(log_path, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=10)
+    assert [results.get(timeout=1) for _ in workers] == ['значение'] * 4
+    assert len(log_path.read_text().split()) == 1, (
+        "Убедитесь, что при одновременном промахе значение пересчитывает"
+        " только один процесс, а остальные ждут его результата."
+    )
+
+
+def test_get_or_set_serves_stale_value_while_locked(locked_elsewhere):
+    key = 'blog:test:stale'
+    cache.set(key, ('старое', time.time() - 1, 0.0), 60)
+    with locked_elsewhere(key):
+        assert get_or_set(key, lambda: 'новое', 60) == 'старое', (
+            "Убедитесь, что пока значение пересчитывает другой запрос,"
+            " отдаётся прежнее."
+        )
+    assert get_or_set(key, lambda: 'новое', 60) == 'новое'
+
+
+def test_get_or_set_recomputes_early(monkeypatch):
+    from blog import cache as blog_cache
+
+    monkeypatch.setattr(blog_cache.random, 'random', lambda: 0.5)
+    key = 'blog:test:early'
+    # Посчитанное за 10 с значение, которому осталось жить 5 с.
+    cache.set(key, ('старое', time.time() + 5, 10.0), 60)
+    assert get_or_set(key, lambda: 'новое', 60) == 'новое', (
+        "Убедитесь, что долго считающееся значение пересчитывается"
+        " незадолго до срока, не дожидаясь его."
+    )
+    cache.set(key, ('старое', time.time() + 60, 0.1), 60)
+    assert get_or_set(key, lambda: 'новое', 60) == 'старое'
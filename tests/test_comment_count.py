@@ -0,0 +1,80 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from blog.models import Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_comment_views_update_counter(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for text in ('Первый', 'Второй'):
+        user_client.post(f'/posts/{post.id}/comment/', {'text': text})
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что при создании комментария увеличивается"
+        " `Post.comment_count`."
+    )
+
+    comment = Comment.objects.filter(post=post).first()
+    user_client.post(f'/posts/{post.id}/delete_comment/{comment.id}')
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что при удалении комментария уменьшается"
+        " `Post.comment_count`."
+    )
+
+
+def test_recount_comments_repairs_drift(
+        mixer, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(3).blend(Comment, post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=42)
+
+    out = StringIO()
+    call_command('recount_comments', '--dry-run', stdout=out)
+    assert 'расхождений: 1' in out.getvalue()
+    post.refresh_from_db()
+    assert post.comment_count == 42
+
+    call_command('recount_comments', stdout=StringIO())
+    post.refresh_from_db()
+    assert post.comment_count == 3
+
+
+def test_comment_created_outside_views_is_counted(
+        user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    comment = Comment.objects.create(post=post, author=user, text='Из shell')
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что `Post.comment_count` учитывает комментарии,"
+        " созданные не через форму на сайте."
+    )
+
+    Post.objects.filter(pk=post.pk).update(comment_count=0)
+    response = user_client.post(
+        f'/posts/{post.id}/delete_comment/{comment.id}'
+    )
+    assert response.status_code == 302
+    post.refresh_from_db()
+    assert post.comment_count == 0, (
+        "Убедитесь, что удаление комментария не уводит"
+        " `Post.comment_count` ниже нуля."
+    )
+
+
+def test_post_delete_does_not_touch_each_comment(
+        django_assert_max_num_queries, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(50).blend(Comment, post=post)
+    with django_assert_max_num_queries(25):
+        post.delete()
+    assert not Comment.objects.exists()
@@ -0,0 +1,102 @@
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+
+pytestmark = [pytest.mark.django_db]
+
+
+def revalidate(client, url, etag):
+    return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+
+def test_feed_pages_answer_not_modified(
+        client, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    for url in ('/', f'/category/{post.category.slug}/',
+                f'/profile/{post.author.username}/'):
+        etag = client.get(url)['ETag']
+        response = revalidate(client, url, etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f"Убедитесь, что страница {url} отвечает 304 на If-None-Match"
+            " с актуальным ETag."
+        )
+        assert not response.templates, (
+            "Убедитесь, что для ответа 304 шаблон не рендерится."
+        )
+
+    etag = client.get('/')['ETag']
+    post.author.username = 'renamed'
+    post.author.save()
+    assert revalidate(client, '/', etag).status_code == HTTPStatus.OK, (
+        "Убедитесь, что ETag ленты меняется вместе с карточками на странице."
+    )
+    etag = client.get('/')['ETag']
+    mixer.blend('blog.Comment', post=post)
+    assert revalidate(client, '/', etag).status_code == HTTPStatus.OK
+
+
+def test_detail_etag_follows_post_and_comments(
+        client, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    url = f'/posts/{post.id}/'
+    etag = client.get(url)['ETag']
+    assert revalidate(client, url, etag).status_code == (
+        HTTPStatus.NOT_MODIFIED
+    )
+
+    post.location.name = 'Другое место'
+    post.location.save()
+    assert revalidate(client, url, etag).status_code == HTTPStatus.OK
+    etag = client.get(url)['ETag']
+
+    comment = mixer.blend('blog.Comment', post=post)
+    assert revalidate(client, url, etag).status_code == HTTPStatus.OK
+    etag = client.get(url)['ETag']
+
+    comment.author.username = 'commenter'
+    comment.author.save()
+    assert revalidate(client, url, etag).status_code == HTTPStatus.OK, (
+        "Убедитесь, что ETag поста зависит от авторов комментариев."
+    )
+
+
+def test_etag_depends_on_viewer(
+        client, mixer, user_client, user, published_category
+):
+    mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=False,
+    )
+    url = f'/profile/{user.username}/'
+    public = client.get(url)['ETag']
+    own = user_client.get(url)['ETag']
+    assert public != own, (
+        "Убедитесь, что автор и читатели получают разные ETag профиля:"
+        " автор видит свои неопубликованные посты."
+    )
+    assert revalidate(user_client, url, public).status_code == HTTPStatus.OK
+    assert revalidate(client, url, own).status_code == HTTPStatus.OK
+
+
+def test_not_modified_keeps_etag_and_follows_csrf_token(
+        user_client, post_with_published_location
+):
+    url = f'/posts/{post_with_published_location.id}/'
+    etag = user_client.get(url)['ETag']
+    response = revalidate(user_client, url, etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag, (
+        "Убедитесь, что ответ 304 содержит заголовок ETag."
+    )
+
+    # Так меняется токен при входе (django.middleware.csrf.rotate_token).
+    user_client.cookies[settings.CSRF_COOKIE_NAME] = get_token(HttpRequest())
+    assert revalidate(user_client, url, etag).status_code == HTTPStatus.OK, (
+        "Убедитесь, что при смене CSRF-токена страница с формами"
+        " перерисовывается, а не берётся из кэша браузера."
+    )
@@ -0,0 +1,83 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.template.loader import render_to_string
+
+from blog.models import FeedCounter, Post
+from blog.pagination import CachedPaginator
+
+pytestmark = [pytest.mark.django_db]
+
+
+def stored_counters():
+    return {
+        (scope, key): count
+        for scope, key, count in FeedCounter.objects.values_list(
+            'scope', 'key', 'count'
+        )
+        if count
+    }
+
+
+def test_signals_keep_feed_counters_exact(
+        mixer, many_posts_with_published_locations, another_category
+):
+    posts = many_posts_with_published_locations
+    post = posts[0]
+    post.category = another_category
+    post.is_published = not post.is_published
+    post.save()
+    posts[1].delete()
+
+    out = StringIO()
+    call_command('recount_feeds', '--dry-run', stdout=out)
+    assert 'расхождений: 0' in out.getvalue(), (
+        "Убедитесь, что сигналы публикаций поддерживают счётчики лент"
+        " в актуальном состоянии."
+    )
+    author_posts = Post.objects.filter(author=post.author).count()
+    assert stored_counters()[
+        FeedCounter.AUTHOR_ALL, post.author_id
+    ] == author_posts
+
+
+def test_recount_feeds_repairs_drift(many_posts_with_published_locations):
+    expected = stored_counters()
+    FeedCounter.objects.update(count=42)
+    call_command('recount_feeds', stdout=StringIO())
+    assert stored_counters() == expected
+
+
+def test_long_feed_count_comes_from_counter(
+        monkeypatch, many_posts_with_published_locations
+):
+    monkeypatch.setattr(CachedPaginator, 'count_limit', 5)
+    posts = Post.objects.all()
+    assert CachedPaginator(
+        posts, 10, count_estimate=lambda: 1000
+    ).count == 1000, (
+        "Убедитесь, что для длинной ленты число публикаций берётся"
+        " из счётчика, а не из COUNT(*)."
+    )
+    assert CachedPaginator(posts, 10, count_estimate=lambda: 0).count == 6
+    short = posts.filter(pk__in=[post.pk for post in posts[:3]])
+    assert CachedPaginator(
+        short, 10, count_estimate=lambda: 1000
+    ).count == 3
+
+
+def test_estimated_count_hides_last_pages(
+        monkeypatch, many_posts_with_published_locations
+):
+    monkeypatch.setattr(CachedPaginator, 'count_limit', 5)
+    page = CachedPaginator(
+        Post.objects.order_by('pk'), 1, count_estimate=lambda: 1000
+    ).page(2)
+    pages = list(page.paginator.get_elided_page_range(2, on_ends=2))
+    assert pages[-1] == page.paginator.ELLIPSIS and 1000 not in pages, (
+        "Убедитесь, что при оценённом числе публикаций пагинатор"
+        " не ссылается на последние страницы ленты."
+    )
+    html = render_to_string('includes/paginator.html', {'page_obj': page})
+    assert 'Последняя' not in html and '?page=1000' not in html
@@ -0,0 +1,140 @@
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from blog.models import Post
+from blogicum.const import IMAGE_WIDTHS
+from core.models import Job
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def upload(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+    def make(width, height=None, color='red', exif=None):
+        buffer = BytesIO()
+        image = Image.new('RGB', (width, height or width), color)
+        if exif:
+            image.save(buffer, 'JPEG', exif=exif)
+        else:
+            image.save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue())
+    return make
+
+
+def run_worker():
+    out = StringIO()
+    call_command('run_worker', '--once', '--processes', '0', stdout=out)
+    return out.getvalue()
+
+
+def test_upload_builds_content_addressed_variants(
+        mixer, upload, tmp_path
+):
+    post = mixer.blend('blog.Post', image=upload(1600, 1000))
+    assert Post.objects.get(pk=post.pk).image_variants == {}, (
+        "Убедитесь, что копии иллюстрации строятся в фоне,"
+        " а не при сохранении поста."
+    )
+    assert 'Выполнено задач: 1' in run_worker()
+
+    variants = Post.objects.get(pk=post.pk).image_variants
+    assert (variants['width'], variants['height']) == (1600, 1000)
+    for key, extension in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+        assert [width for width, _ in variants[key]] == list(IMAGE_WIDTHS), (
+            "Убедитесь, что для иллюстрации строятся копии всех ширин"
+            " из IMAGE_WIDTHS в WebP и JPEG."
+        )
+        for width, name in variants[key]:
+            with Image.open(tmp_path / name) as image:
+                assert image.format == extension
+                assert image.width == width
+
+    same = mixer.blend('blog.Post', image=upload(1600, 1000))
+    small = mixer.blend('blog.Post', image=upload(200, color='blue'))
+    run_worker()
+    assert Post.objects.get(pk=same.pk).image_variants == variants, (
+        "Убедитесь, что копии одинаковых картинок хранятся по хешу"
+        " содержимого и не дублируются."
+    )
+    small_variants = Post.objects.get(pk=small.pk).image_variants
+    assert [width for width, _ in small_variants['jpeg']] == [200]
+    assert small_variants['jpeg'][0][1] != variants['jpeg'][0][1]
+
+
+def test_worker_strips_exif_from_original(mixer, upload):
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    post = mixer.blend('blog.Post', image=upload(400, exif=exif))
+    original = post.image.name
+    run_worker()
+    post.refresh_from_db()
+    with Image.open(post.image.path) as image:
+        assert not image.getexif(), (
+            "Убедитесь, что воркер убирает EXIF из оригинала иллюстрации."
+        )
+    assert post.image.name != original
+    assert not post.image.storage.exists(original), (
+        "Убедитесь, что прежний файл удаляется после того, как пост"
+        " перешёл на очищенную копию."
+    )
+
+
+def test_failed_strip_keeps_original(mixer, monkeypatch, upload):
+    def broken(*args, **kwargs):
+        raise OSError('Нет места на диске')
+
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    post = mixer.blend('blog.Post', image=upload(400, exif=exif))
+    monkeypatch.setattr(FileSystemStorage, 'save', broken)
+    run_worker()
+    post.refresh_from_db()
+    assert post.image.storage.exists(post.image.name), (
+        "Убедитесь, что сбой обработки не оставляет пост без иллюстрации."
+    )
+    assert Job.objects.get().status == Job.PENDING
+
+
+def test_failed_job_is_retried_then_marked_failed(mixer, upload):
+    post = mixer.blend('blog.Post', image=upload(400))
+    post.image.storage.delete(post.image.name)
+    run_worker()
+    job = Job.objects.get()
+    assert job.status == Job.PENDING and job.attempts == 1
+    assert 'Error' in job.error
+    Job.objects.update(run_after=job.created_at)
+    run_worker()
+    Job.objects.update(run_after=job.created_at)
+    run_worker()
+    assert Job.objects.get().status == Job.FAILED
+
+
+def test_pages_fall_back_to_original_until_variants_are_ready(
+        client, upload, post_with_published_location
+):
+    post = post_with_published_location
+    post.image = upload(1600)
+    post.save()
+    post.refresh_from_db()
+    for url in (f'/posts/{post.id}/', '/'):
+        content = client.get(url).content.decode('utf-8')
+        assert f'src="{post.image.url}"' in content
+
+    run_worker()
+    post.refresh_from_db()
+    for url in (f'/posts/{post.id}/', '/'):
+        content = client.get(url).content.decode('utf-8')
+        assert '<source type="image/webp" srcset="' in content, (
+            f"Убедитесь, что на странице {url} выводится srcset"
+            " с WebP-копиями иллюстрации."
+        )
+        assert f'src="{post.image.url}"' not in content
+        assert f'href="{post.image.url}"' in content
+        assert 'width="1600" height="1600"' in content
@@ -0,0 +1,48 @@
+import re
+
+import pytest
+from django.db import connection
+
+from blog.mixins import BaseQuerysetMixin
+from blog.models import Comment, Post
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != 'sqlite',
+        reason='План запроса проверяется в формате SQLite.',
+    ),
+]
+
+
+def assert_uses_index(queryset, index_name):
+    plan = queryset.explain()
+    assert f'USING INDEX {index_name}' in plan, (
+        f"Убедитесь, что запрос использует индекс `{index_name}`:\n{plan}"
+    )
+    assert not re.search(r'\bSCAN (TABLE )?blog_(post|comment)\b', plan), (
+        f"Убедитесь, что запрос не сканирует таблицу целиком:\n{plan}"
+    )
+    assert 'TEMP B-TREE' not in plan, (
+        f"Убедитесь, что сортировка берётся из индекса:\n{plan}"
+    )
+
+
+def test_feed_queries_use_indexes(
+        user, many_posts_with_published_locations
+):
+    post = many_posts_with_published_locations[0]
+    feed = BaseQuerysetMixin().get_queryset()
+
+    assert_uses_index(feed[:10], 'post_published_feed_idx')
+    assert_uses_index(
+        feed.filter(category=post.category)[:10], 'post_category_feed_idx'
+    )
+    assert_uses_index(feed.filter(author=user)[:10], 'post_author_feed_idx')
+    assert_uses_index(
+        Post.objects.filter(author=user).order_by('-pub_date', '-pk')[:10],
+        'post_author_feed_idx',
+    )
+    assert_uses_index(
+        Comment.objects.filter(post=post), 'comment_post_created_idx'
+    )
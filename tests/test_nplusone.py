@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+import pytest
+from django.template.loader import render_to_string
+from django.test import Client
+from django.urls import reverse
+
+from blog.models import Post
+from core.nplusone import NPlusOneError, detect_n_plus_one
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def blog_with_comments(mixer, published_category, published_locations):
+    """Посты разных авторов, в разных местах и с комментариями разных
+    пользователей: ленивая подгрузка любой связи даёт N+1.
+    """
+    posts = mixer.cycle(12).blend(
+        'blog.Post',
+        title=mixer.sequence('Пост {0}'),
+        category=published_category,
+        location=mixer.sequence(*published_locations),
+    )
+    post = posts[0]
+    comments = mixer.cycle(5).blend('blog.Comment', post=post)
+    # Свой комментарий автора: его формы правки и удаления рендерятся.
+    comments.append(
+        mixer.blend('blog.Comment', post=post, author=post.author)
+    )
+    return post, comments
+
+
+def blog_urls(post, comment):
+    kwargs = {'post_id': post.id}
+    comment_kwargs = {**kwargs, 'comment_id': comment.id}
+    return (
+        reverse('blog:index'),
+        reverse('blog:index') + '?page=2',
+        reverse('blog:category_posts', args=(post.category.slug,)),
+        reverse('blog:profile', args=(post.author.username,)),
+        reverse('blog:post_detail', kwargs=kwargs),
+        reverse('blog:comments', kwargs=kwargs),
+        reverse('blog:comments', kwargs=kwargs) + '?format=json',
+        reverse('blog:search') + '?q=Пост',
+        reverse('blog:create_post'),
+        reverse('blog:edit_post', kwargs=kwargs),
+        reverse('blog:delete_post', kwargs=kwargs),
+        reverse('blog:edit_comment', kwargs=comment_kwargs),
+        reverse('blog:delete_comment', kwargs=comment_kwargs),
+        reverse('blog:edit_profile'),
+    )
+
+
+@pytest.mark.parametrize('as_author', (False, True))
+def test_blog_urls_have_no_n_plus_one(
+        assert_no_n_plus_one, blog_with_comments, as_author
+):
+    post, comments = blog_with_comments
+    client = Client()
+    if as_author:
+        client.force_login(post.author)
+    for url in blog_urls(post, comments[-1]):
+        with assert_no_n_plus_one():
+            response = client.get(url)
+        assert response.status_code in (
+            HTTPStatus.OK, HTTPStatus.FOUND, HTTPStatus.MOVED_PERMANENTLY
+        ), url
+
+
+def test_detector_names_template_line(blog_with_comments):
+    with detect_n_plus_one() as detector:
+        for post in Post.objects.all():
+            render_to_string('includes/post_card.html', {'post': post})
+    origins = {origin for _, _, origin in detector.findings}
+    assert any(
+        origin.startswith('includes/post_card.html:') for origin in origins
+    ), (
+        "Убедитесь, что детектор N+1 указывает строку шаблона, из которой"
+        " выполняется повторяющийся запрос."
+    )
+
+
+def test_middleware_raises_with_view_name(
+        settings, client, post_with_published_location
+):
+    settings.NPLUSONE_ACTION = 'raise'
+    settings.NPLUSONE_SAMPLE_RATE = 1
+    settings.NPLUSONE_THRESHOLD = 1
+    with pytest.raises(NPlusOneError, match='blog:index'):
+        client.get('/')
@@ -0,0 +1,105 @@
+import hashlib
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.middleware import RenderLease
+
+pytestmark = [pytest.mark.django_db]
+
+
+def is_cached(response):
+    return not response.templates
+
+
+def test_anonymous_pages_are_served_from_cache(
+        client, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for url in ('/', f'/category/{post.category.slug}/',
+                f'/posts/{post.id}/'):
+        first = client.get(url)
+        second = client.get(url)
+        assert is_cached(second) and second.content == first.content, (
+            f"Убедитесь, что анонимный читатель получает страницу {url}"
+            " из кэша страниц."
+        )
+        assert second['ETag'] == first['ETag']
+        assert not is_cached(user_client.get(url)), (
+            "Убедитесь, что авторизованные пользователи не получают"
+            " страницы из общего кэша."
+        )
+    assert not is_cached(client.get('/?page=1')), (
+        "Убедитесь, что query string входит в ключ кэша страниц."
+    )
+
+
+def test_page_cache_follows_signals(client, post_with_published_location):
+    post = post_with_published_location
+    url = f'/posts/{post.id}/'
+    client.get(url)
+    post.location.name = 'Новое место'
+    post.location.save()
+    response = client.get(url)
+    assert 'Новое место' in response.content.decode(), (
+        "Убедитесь, что сигналы моделей делают копию страницы устаревшей."
+    )
+
+
+def test_stale_page_is_served_while_another_request_renders(
+        client, post_with_published_location
+):
+    post = post_with_published_location
+    old = client.get('/').content
+    post.title = 'Новый заголовок'
+    post.save()
+
+    lease = RenderLease(hashlib.md5(b'/').hexdigest())
+    assert lease.acquire(blocking=False)
+    try:
+        response = client.get('/')
+    finally:
+        lease.release()
+    assert is_cached(response) and response.content == old, (
+        "Убедитесь, что пока страницу перерисовывает другой запрос,"
+        " читатели получают её устаревшую копию."
+    )
+    assert 'Новый заголовок' in client.get('/').content.decode()
+
+
+def test_page_cache_respects_scheduled_posts(
+        client, mixer, monkeypatch, post_with_published_location
+):
+    from blog import schedule
+
+    post = post_with_published_location
+    go_live = timezone.now() + timedelta(hours=1)
+    scheduled = mixer.blend(
+        'blog.Post', author=post.author, category=post.category,
+        pub_date=go_live, title='Отложенный пост',
+    )
+    assert scheduled.title not in client.get('/').content.decode()
+    monkeypatch.setattr(
+        schedule.timezone, 'now', lambda: go_live + timedelta(seconds=1)
+    )
+    assert scheduled.title in client.get('/').content.decode(), (
+        "Убедитесь, что закэшированная лента устаревает в момент выхода"
+        " отложенной публикации."
+    )
+
+
+def test_render_lease_is_per_page():
+    first, same, other = (
+        RenderLease(hashlib.md5(path).hexdigest())
+        for path in (b'/', b'/', b'/?page=2')
+    )
+    assert first.acquire(blocking=False)
+    assert not same.acquire(blocking=False), (
+        "Убедитесь, что страницу перерисовывает только один запрос."
+    )
+    assert other.acquire(blocking=False), (
+        "Убедитесь, что рендеринг одной страницы не ждёт другие страницы."
+    )
+    first.release()
+    assert same.acquire(blocking=False)
@@ -0,0 +1,113 @@
+from http import HTTPStatus
+
+import pytest
+from conftest import N_PER_PAGE
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+
+from blogicum.const import COMMENTS_COUNT
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _walk_cursor_pages(client, url):
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    pages = [response.context['page_obj']]
+    while pages[-1].has_next():
+        response = client.get(url, {'cursor': pages[-1].next_cursor})
+        assert response.status_code == HTTPStatus.OK, (
+            "Убедитесь, что страница по курсору загружается без ошибок."
+        )
+        pages.append(response.context['page_obj'])
+    return pages
+
+
+def test_cursor_pagination_walks_whole_feed(
+        user_client, many_posts_with_published_locations
+):
+    posts = many_posts_with_published_locations
+    category = posts[0].category
+    for url in (
+        '/',
+        f'/category/{category.slug}/',
+        f'/profile/{posts[0].author.username}/',
+    ):
+        offset_ids = []
+        page_number = 1
+        while True:
+            page = user_client.get(url, {'page': page_number}).context[
+                'page_obj'
+            ]
+            offset_ids += [post.id for post in page]
+            if not page.has_next():
+                break
+            page_number += 1
+
+        pages = _walk_cursor_pages(user_client, url)
+        cursor_ids = [post.id for page in pages for post in page]
+        assert cursor_ids == offset_ids, (
+            f"Убедитесь, что курсорная пагинация на странице {url} выдаёт те"
+            " же публикации и в том же порядке, что и ?page=N."
+        )
+        assert all(len(page) <= N_PER_PAGE for page in pages)
+
+        back = user_client.get(url, {'cursor': pages[-1].previous_cursor})
+        assert [post.id for post in back.context['page_obj']] == [
+            post.id for post in pages[-2]
+        ], "Убедитесь, что курсор «назад» возвращает предыдущую страницу."
+
+
+def test_invalid_cursor_returns_404(user_client):
+    response = user_client.get('/', {'cursor': 'not-a-cursor'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_comments_are_loaded_in_batches(
+        client, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    comments = mixer.cycle(COMMENTS_COUNT * 2 + 1).blend(
+        'blog.Comment', post=post
+    )
+    expected = sorted(comments, key=lambda c: (c.created_at, c.id))
+
+    first = client.get(f'/posts/{post.id}/').context['comments']
+    assert [c.id for c in first] == [
+        c.id for c in expected[:COMMENTS_COUNT]
+    ], "Убедитесь, что на странице поста выводится первая порция комментариев."
+
+    loaded = list(first)
+    cursor = first.next_cursor
+    while cursor:
+        batch = client.get(
+            f'/posts/{post.id}/comments/',
+            {'cursor': cursor, 'format': 'json'},
+        ).json()
+        loaded += batch['comments']
+        cursor = batch['next_cursor']
+    assert len(loaded) == len(expected)
+    assert [c['id'] for c in loaded[COMMENTS_COUNT:]] == [
+        c.id for c in expected[COMMENTS_COUNT:]
+    ]
+
+    fragment = client.get(
+        f'/posts/{post.id}/comments/', {'cursor': first.next_cursor}
+    )
+    content = fragment.content.decode('utf-8')
+    assert f'comment_{expected[COMMENTS_COUNT].id}"' in content
+    assert 'Показать ещё' in content
+
+
+@pytest.mark.parametrize('number', (1, 7, 500, 1000))
+def test_paginator_renders_bounded_page_window(number):
+    page = Paginator(range(10000), N_PER_PAGE).page(number)
+    html = render_to_string('includes/paginator.html', {'page_obj': page})
+    links = html.count('class="page-item')
+    # Первая, «назад», «вперёд», Последняя и окно номеров с многоточиями.
+    assert links <= 4 + 11, (
+        "Убедитесь, что пагинатор выводит ограниченное окно номеров"
+        " страниц вокруг текущей, а не все страницы ленты."
+    )
+    assert f'<span class="page-link">{number}</span>' in html
+    assert '1000</' in html, "Убедитесь, что номер последней страницы виден."
@@ -0,0 +1,138 @@
+import re
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post_with_comments(mixer, post_with_published_location):
+    mixer.cycle(5).blend('blog.Comment', post=post_with_published_location)
+    return post_with_published_location
+
+
+@pytest.mark.parametrize(
+    ('client_fixture', 'cold_queries', 'warm_queries'),
+    (
+        # Пост с автором, категорией и местом + комментарии с авторами;
+        # повторно анонимный читатель получает страницу из кэша страниц.
+        ('unlogged_client', 2, 0),
+        # Плюс сессия и пользователь: автор и читатель.
+        ('user_client', 4, 3),
+        ('another_user_client', 4, 3),
+    ),
+)
+def test_post_detail_query_count(
+        request, django_assert_num_queries, post_with_comments,
+        client_fixture, cold_queries, warm_queries
+):
+    client = request.getfixturevalue(client_fixture)
+    url = f'/posts/{post_with_comments.id}/'
+
+    cache.clear()
+    with django_assert_num_queries(cold_queries):
+        client.get(url)
+    with django_assert_num_queries(warm_queries):
+        client.get(url)
+
+
+def lookups(queries, condition):
+    return [q for q in queries if condition in q['sql']]
+
+
+def test_profile_and_category_lookups_are_memoized(
+        client, post_with_published_location
+):
+    post = post_with_published_location
+    for url, condition, rename in (
+        (
+            f'/category/{post.category.slug}/',
+            '"blog_category"."slug" =',
+            lambda: setattr(post.category, 'title', 'Новое название'),
+        ),
+        (
+            f'/profile/{post.author.username}/',
+            '"users_myuser"."username" =',
+            lambda: setattr(post.author, 'first_name', 'Новое имя'),
+        ),
+    ):
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        assert len(lookups(ctx.captured_queries, condition)) == 1, (
+            f"Убедитесь, что объект страницы {url} загружается один раз"
+            " за запрос."
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        assert not lookups(ctx.captured_queries, condition), (
+            f"Убедитесь, что объект страницы {url} берётся из кэша."
+        )
+
+        rename()
+        post.category.save()
+        post.author.save()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        assert len(lookups(ctx.captured_queries, condition)) == 1, (
+            "Убедитесь, что кэш поиска сбрасывается при сохранении объекта."
+        )
+        assert 'Новое' in response.content.decode('utf-8')
+
+
+FEED_COLUMNS = {
+    ('blog_post', 'id'),
+    ('blog_post', 'title'),
+    ('blog_post', 'text'),  # только SUBSTR(...) для превью
+    ('blog_post', 'pub_date'),
+    ('blog_post', 'is_published'),
+    ('blog_post', 'image'),
+    ('blog_post', 'image_variants'),
+    ('blog_post', 'comment_count'),
+    ('blog_post', 'author_id'),
+    ('blog_post', 'category_id'),
+    ('blog_post', 'location_id'),
+    ('users_myuser', 'id'),
+    ('users_myuser', 'username'),
+    ('blog_category', 'id'),
+    ('blog_category', 'title'),
+    ('blog_category', 'slug'),
+    ('blog_category', 'is_published'),
+    ('blog_location', 'id'),
+    ('blog_location', 'name'),
+    ('blog_location', 'is_published'),
+}
+
+
+@pytest.mark.parametrize('owner', (False, True))
+def test_feed_pages_run_rows_and_count_queries_only(
+        client, user_client, many_posts_with_published_locations, owner
+):
+    from blog.schedule import visible_before
+
+    post = many_posts_with_published_locations[0]
+    client = user_client if owner else client
+    for url in (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+    ):
+        # Граница видимости считается отдельно: прогреваем только её.
+        cache.clear()
+        visible_before()
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        queries = [
+            q['sql'] for q in ctx.captured_queries
+            if 'blog_post' in q['sql']
+        ]
+        assert len(queries) == 2, (
+            f"Убедитесь, что страница {url} выполняет один запрос за"
+            " публикациями и один — за их числом:\n" + '\n'.join(queries)
+        )
+        rows_sql = next(sql for sql in queries if 'COUNT(' not in sql)
+        select = rows_sql[:rows_sql.index(' FROM ')]
+        assert set(re.findall(r'"(\w+)"\."(\w+)"', select)) == FEED_COLUMNS
+        assert 'SUBSTR("blog_post"."text"' in select
@@ -0,0 +1,93 @@
+from copy import copy
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+
+from core.middleware import REPLICA_PIN_COOKIE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """Пустая реплика в отдельном файле SQLite: в ней нет ни постов,
+    ни сессий, как у реплики, которая ещё не догнала основную базу."""
+    connections.databases['replica'] = {
+        **connections.databases['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+        'TEST': {},
+    }
+    try:
+        call_command('migrate', database='replica', verbosity=0)
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            yield 'replica'
+    finally:
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+
+
+def copy_to_replica(replica, *objects):
+    """Записывает в реплику копии объектов, как их видит сейчас
+    основная база: дальше реплика «отстаёт» от правок."""
+    for obj in objects:
+        type(obj).objects.using(replica).bulk_create([copy(obj)])
+
+
+def test_reads_go_to_replica_until_client_writes(
+        client, user_client, replica, post_with_published_location
+):
+    post = post_with_published_location
+    response = client.get('/search/', {'q': post.title.split()[0]})
+    assert not response.context['page_obj'], (
+        "Убедитесь, что страница поиска читает из реплики."
+    )
+    url = f'/posts/{post.id}/'
+    assert client.get(url).status_code == HTTPStatus.OK, (
+        "Убедитесь, что записи общего кэша считаются по основной базе,"
+        " а не по отстающей реплике."
+    )
+
+    response = user_client.post(
+        f'/posts/{post.id}/comment/', {'text': 'Свежий комментарий'}
+    )
+    assert REPLICA_PIN_COOKIE in response.cookies, (
+        "Убедитесь, что после записи клиент закрепляется"
+        " за основной базой."
+    )
+    response = user_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert 'Свежий комментарий' in response.content.decode('utf-8'), (
+        "Убедитесь, что автор сразу видит свою запись."
+    )
+    assert REPLICA_PIN_COOKIE not in client.cookies
+
+
+def test_without_replicas_nothing_is_pinned(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    response = user_client.post(
+        f'/posts/{post.id}/comment/', {'text': 'Комментарий'}
+    )
+    assert REPLICA_PIN_COOKIE not in response.cookies
+
+
+def test_post_cards_are_rendered_from_primary(
+        client, replica, post_with_published_location
+):
+    post = post_with_published_location
+    copy_to_replica(
+        replica, post.author, post.category, post.location, post
+    )
+    url = f'/profile/{post.author.username}/'
+    client.get(url)
+    post.location.name = 'Новое место'
+    post.location.save()
+    assert 'Новое место' in client.get(url).content.decode(), (
+        "Убедитесь, что карточка, которая ложится в общий кэш под новым"
+        " поколением, рендерится по основной базе."
+    )
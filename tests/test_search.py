@@ -0,0 +1,101 @@
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from blogicum.const import SEARCH_COUNT
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def blend_post(mixer, user, published_category):
+    def blend(**kwargs):
+        defaults = {
+            'author': user,
+            'category': published_category,
+            'is_published': True,
+            'pub_date': timezone.now() - timedelta(days=1),
+        }
+        return mixer.blend('blog.Post', **{**defaults, **kwargs})
+    return blend
+
+
+def search_ids(client, query, **params):
+    response = client.get('/search/', {'q': query, **params})
+    assert response.status_code == HTTPStatus.OK
+    return [post.id for post in response.context['page_obj']]
+
+
+def test_search_ranks_visible_posts(client, blend_post, mixer):
+    in_text = blend_post(title='Заметка', text='Про Байкал и нерпу')
+    in_title = blend_post(title='Байкал зимой', text='Лёд и ветер')
+    blend_post(title='Другое', text='Ничего общего')
+    blend_post(title='Байкал', text='Черновик', is_published=False)
+    blend_post(
+        title='Байкал', text='Отложено',
+        pub_date=timezone.now() + timedelta(days=1),
+    )
+    blend_post(
+        title='Байкал', text='Скрытая категория',
+        category=mixer.blend('blog.Category', is_published=False),
+    )
+    assert search_ids(client, 'байкал') == [in_title.id, in_text.id], (
+        "Убедитесь, что поиск находит только видимые публикации и"
+        " ставит совпадения в заголовке выше совпадений в тексте."
+    )
+    assert search_ids(client, 'байк') == [in_title.id, in_text.id], (
+        "Убедитесь, что последнее слово запроса ищется по префиксу."
+    )
+    assert search_ids(client, '') == []
+    assert search_ids(client, 'NEAR( "байкал" * OR -') == []
+
+
+def test_search_index_follows_post_changes(client, blend_post):
+    post = blend_post(title='Старый заголовок', text='')
+    post.title = 'Новый заголовок'
+    post.save()
+    assert search_ids(client, 'старый') == []
+    assert search_ids(client, 'новый') == [post.id]
+    post.delete()
+    assert search_ids(client, 'новый') == []
+
+
+def test_search_cursor_walks_all_results(client, blend_post):
+    posts = [
+        blend_post(title='Байкал', text='Байкал ' * (i % 3))
+        for i in range(SEARCH_COUNT * 2 + 3)
+    ]
+    response = client.get('/search/', {'q': 'байкал'})
+    pages = [response.context['page_obj']]
+    while pages[-1].has_next():
+        response = client.get(
+            '/search/', {'q': 'байкал', 'cursor': pages[-1].next_cursor}
+        )
+        pages.append(response.context['page_obj'])
+    found = [post.id for page in pages for post in page]
+    assert sorted(found) == sorted(post.id for post in posts), (
+        "Убедитесь, что курсорная пагинация поиска выдаёт все результаты"
+        " без повторов."
+    )
+    back = client.get(
+        '/search/', {'q': 'байкал', 'cursor': pages[-1].previous_cursor}
+    )
+    assert [post.id for post in back.context['page_obj']] == [
+        post.id for post in pages[-2]
+    ]
+
+
+def test_rebuild_search_index(client, blend_post):
+    post = blend_post(title='Байкал', text='')
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM blog_post_fts')
+    assert search_ids(client, 'байкал') == []
+    out = StringIO()
+    call_command('rebuild_search_index', '--batch-size', '1', stdout=out)
+    assert 'Проиндексировано публикаций: 1' in out.getvalue()
+    assert search_ids(client, 'байкал') == [post.id]
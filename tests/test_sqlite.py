@@ -0,0 +1,33 @@
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_connection_gets_configured_pragmas():
+    with connection.cursor() as cursor:
+        for name in ('busy_timeout', 'cache_size', 'synchronous'):
+            cursor.execute(f'PRAGMA {name}')
+            value, = cursor.fetchone()
+            expected = settings.SQLITE_PRAGMAS[name]
+            if name == 'synchronous':
+                # NORMAL возвращается числом.
+                expected = 1
+            assert value == expected, (
+                f"Убедитесь, что соединению с SQLite выставляется"
+                f" прагма `{name}` из SQLITE_PRAGMAS."
+            )
+
+
+def test_bench_sqlite_reports_both_runs():
+    out = StringIO()
+    call_command(
+        'bench_sqlite', '--seconds', '0.2', '--posts', '100', stdout=out
+    )
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2
+    assert all('чтений/с' in line for line in lines)
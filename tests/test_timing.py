@@ -0,0 +1,60 @@
+import json
+import logging
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def server_timing(response):
+    return {
+        name: (float(dur), desc)
+        for name, dur, desc in re.findall(
+            r'(\w+);dur=([\d.]+);desc="([^"]*)"',
+            response.get('Server-Timing', ''),
+        )
+    }
+
+
+def test_sampled_request_reports_queries_and_render_time(
+        settings, caplog, user_client, post_with_published_location
+):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+    url = f'/posts/{post_with_published_location.id}/'
+    with caplog.at_level(logging.INFO, logger='core.middleware'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = user_client.get(url)
+    metrics = server_timing(response)
+    assert set(metrics) == {'db', 'view', 'tpl', 'total'}, (
+        "Убедитесь, что заголовок Server-Timing содержит время SQL, view,"
+        " рендеринга шаблона и всего запроса."
+    )
+    assert metrics['db'][1] == f'{len(ctx.captured_queries)} queries'
+    assert metrics['total'][0] >= metrics['tpl'][0]
+
+    record, = [
+        json.loads(r.getMessage()) for r in caplog.records
+        if r.name == 'core.middleware'
+    ]
+    assert record['view'] == 'blog:post_detail'
+    assert record['queries'] == len(ctx.captured_queries)
+    assert record['status'] == 200
+
+
+def test_comment_views_are_measured(
+        settings, user_client, post_with_published_location
+):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+    post = post_with_published_location
+    response = user_client.post(
+        f'/posts/{post.id}/comment/', {'text': 'Комментарий'}
+    )
+    assert int(server_timing(response)['db'][1].split()[0]) > 0
+
+
+def test_unsampled_requests_are_not_measured(settings, client):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0
+    assert 'Server-Timing' not in client.get('/')
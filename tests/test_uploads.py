@@ -0,0 +1,102 @@
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def create_post(settings, tmp_path, user_client, published_category):
+    settings.MEDIA_ROOT = tmp_path
+
+    def post(content, name='photo.png'):
+        return user_client.post('/posts/create/', {
+            'title': 'Заголовок',
+            'text': 'Текст',
+            'pub_date': '2020-01-01 12:00',
+            'category': published_category.pk,
+            'image': SimpleUploadedFile(name, content),
+        })
+    return post
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'green').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def png_header(width, height):
+    """PNG с любыми размерами в заголовке и мусором вместо пикселей."""
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    chunk = b'IHDR' + ihdr
+    return (
+        b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(ihdr)) + chunk
+        + struct.pack('>I', zlib.crc32(chunk))
+        + struct.pack('>I', 1024) + b'IDAT' + b'\0' * 1024
+    )
+
+
+def stored_files(tmp_path):
+    return sorted(
+        path.relative_to(tmp_path).as_posix()
+        for path in tmp_path.rglob('*') if path.is_file()
+    )
+
+
+def test_upload_is_moved_into_storage(create_post, tmp_path):
+    content = png(64, 48)
+    response = create_post(content)
+    assert response.status_code == 302
+    post = Post.objects.get()
+    assert (tmp_path / post.image.name).read_bytes() == content
+    assert stored_files(tmp_path) == [post.image.name], (
+        "Убедитесь, что загруженная иллюстрация сохраняется одним файлом,"
+        " без копий во временных каталогах."
+    )
+
+
+@pytest.mark.parametrize('content, message', (
+    (png_header(20000, 20000), 'мегапикселей'),
+    (b'not an image' * 100, 'Загрузите правильное изображение'),
+), ids=('bomb', 'not_image'))
+def test_bad_image_is_rejected_by_header(
+        create_post, tmp_path, content, message
+):
+    response = create_post(content)
+    assert response.status_code == 200
+    assert message in str(response.context['form'].errors['image']), (
+        "Убедитесь, что иллюстрация проверяется по заголовку"
+        " при загрузке и форма сообщает причину отказа."
+    )
+    assert not Post.objects.exists()
+    assert stored_files(tmp_path) == []
+
+
+def test_oversized_upload_stops_being_stored(
+        create_post, tmp_path, monkeypatch
+):
+    from blog import uploads
+
+    writes = []
+    monkeypatch.setattr(uploads, 'IMAGE_UPLOAD_MAX_SIZE', 100 * 1024)
+    monkeypatch.setattr(
+        uploads.IncomingUpload, 'write',
+        lambda self, data: writes.append(len(data)) or self.file.write(data),
+        raising=False,
+    )
+    response = create_post(png(16, 16) + b'\0' * 1024 * 1024)
+    assert 'не должен быть больше' in str(
+        response.context['form'].errors['image']
+    )
+    assert sum(writes) <= 100 * 1024, (
+        "Убедитесь, что запись на диск прекращается, как только файл"
+        " превысил IMAGE_UPLOAD_MAX_SIZE."
+    )
+    assert stored_files(tmp_path) == []